@@ -4,27 +4,31 @@ Main script for analyzing flight patterns over Amsterdam Noord
 """
 import json
 import sys
+import functools
+import numpy as np
+import pandas as pd
 from pathlib import Path
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-# Import our custom modules
-from opensky_fetcher import OpenSkyFetcher
-from flight_analyzer import FlightAnalyzer  
+# Import our custom modules (OpenSkyFetcher and FlightAnalyzer are imported
+# where needed - they pull in requests/matplotlib/folium)
 from cache_manager import FlightCache
 
+# Credential file locations tried in order when no path is given
+_CRED_CANDIDATES = [
+    Path.home() / "Downloads" / "credentials.json",
+    Path(".") / "credentials.json",
+    Path(".") / "config" / "credentials.json"
+]
+
 
 def load_credentials(cred_path: str = None) -> dict:
     """Load OpenSky API credentials"""
     if cred_path is None:
         # Try common locations
-        possible_paths = [
-            Path.home() / "Downloads" / "credentials.json",
-            Path(".") / "credentials.json",
-            Path(".") / "config" / "credentials.json"
-        ]
-        
-        for path in possible_paths:
+        for path in _CRED_CANDIDATES:
             if path.exists():
                 cred_path = path
                 break
@@ -32,7 +36,21 @@ def load_credentials(cred_path: str = None) -> dict:
     if cred_path is None:
         print("No credentials file found. Using anonymous access (limited API calls)")
         return {}
-        
+    
+    # Re-parse only when the file changes
+    try:
+        resolved = Path(cred_path).resolve()
+        mtime_ns = resolved.stat().st_mtime_ns
+    except OSError as e:
+        print(f"Error loading credentials: {e}")
+        return {}
+    
+    return dict(_load_credentials_cached(str(resolved), mtime_ns))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_credentials_cached(cred_path: str, mtime_ns: int) -> dict:
+    """Parse a credentials file (memoized on path and modification time)"""
     try:
         with open(cred_path, 'r') as f:
             creds = json.load(f)
@@ -62,6 +80,12 @@ def load_credentials(cred_path: str = None) -> dict:
         return {}
 
 
+def _render(method_name: str, flight_data, save_path: str):
+    """Run one FlightAnalyzer visualization in a worker process"""
+    from flight_analyzer import FlightAnalyzer
+    getattr(FlightAnalyzer(), method_name)(flight_data, save_path=save_path)
+
+
 def main():
     """Main analysis workflow"""
     parser = argparse.ArgumentParser(description="Amsterdam Noord Flight Pattern Analysis")
@@ -87,7 +111,6 @@ def main():
     
     # Initialize components
     cache = FlightCache()
-    analyzer = FlightAnalyzer()
     
     # Handle cleanup if requested
     if args.cleanup:
@@ -112,6 +135,8 @@ def main():
         flight_data = cache.load_opensky_data(hours_back=24)
         
     else:
+        from opensky_fetcher import OpenSkyFetcher
+        
         # Load credentials
         creds = load_credentials(args.credentials)
         fetcher = OpenSkyFetcher(**creds)
@@ -142,6 +167,9 @@ def main():
     print(f"✅ Successfully loaded {len(flight_data)} flight records")
     print()
     
+    from flight_analyzer import FlightAnalyzer
+    analyzer = FlightAnalyzer()
+    
     # Generate text report
     print("GENERATING ANALYSIS REPORT...")
     report = analyzer.generate_report(flight_data)
@@ -151,26 +179,20 @@ def main():
     print("CREATING VISUALIZATIONS...")
     
     try:
-        # Create flight map
-        print("  📍 Creating flight position map...")
-        flight_map = analyzer.create_flight_map(
-            flight_data, 
-            save_path="amsterdam_flights_map.html"
-        )
-        
-        # Create altitude analysis plots
-        print("  📊 Creating altitude distribution plots...")
-        analyzer.plot_altitude_distribution(
-            flight_data,
-            save_path="altitude_analysis.png"
-        )
-        
-        # Create time pattern plots  
-        print("  📈 Creating time pattern analysis...")
-        analyzer.plot_time_patterns(
-            flight_data,
-            save_path="time_patterns.png"
-        )
+        # The three outputs are independent, so render them side by side
+        # (separate processes: folium is pure Python and pyplot isn't thread-safe)
+        with ProcessPoolExecutor(max_workers=3) as ex:
+            print("  📍 Creating flight position map...")
+            futures = [ex.submit(_render, 'create_flight_map', flight_data, "amsterdam_flights_map.html")]
+            
+            print("  📊 Creating altitude distribution plots...")
+            futures.append(ex.submit(_render, 'plot_altitude_distribution', flight_data, "altitude_analysis.png"))
+            
+            print("  📈 Creating time pattern analysis...")
+            futures.append(ex.submit(_render, 'plot_time_patterns', flight_data, "time_patterns.png"))
+            
+            for future in futures:
+                future.result()
         
         print()
         print("✅ Analysis complete!")
@@ -190,22 +212,29 @@ def main():
         print()
         print("KEY INSIGHTS:")
         
-        # Count low altitude flights
+        # Gather all aggregates in one pass over the columns (no filtered copies)
+        insights = {}
         if 'baro_altitude' in flight_data.columns:
-            low_alt = flight_data[flight_data['baro_altitude'] < 3000]
-            if len(low_alt) > 0:
-                print(f"  ✈️  {len(low_alt)} flights detected below 3000ft (potentially noisy)")
+            insights['low_alt'] = int((flight_data['baro_altitude'] < 3000).sum())
+        if 'aircraft_type' in flight_data.columns:
+            types = pd.Categorical(flight_data['aircraft_type'])
+            codes = types.codes[types.codes >= 0]
+            insights['most_common'] = types.categories[np.bincount(codes).argmax()] if codes.size else None
+        if 'origin_country' in flight_data.columns:
+            insights['dutch_flights'] = int((flight_data['origin_country'].values == 'Netherlands').sum())
+        
+        # Count low altitude flights
+        if insights.get('low_alt'):
+            print(f"  ✈️  {insights['low_alt']} flights detected below 3000ft (potentially noisy)")
                 
         # Most common aircraft types
-        if 'aircraft_type' in flight_data.columns:
-            most_common = flight_data['aircraft_type'].value_counts().iloc[0]
-            print(f"  🏷️  Most common aircraft type: {most_common}")
+        if insights.get('most_common') is not None:
+            print(f"  🏷️  Most common aircraft type: {insights['most_common']}")
             
         # International vs domestic
-        if 'origin_country' in flight_data.columns:
-            dutch_flights = len(flight_data[flight_data['origin_country'] == 'Netherlands'])
+        if 'dutch_flights' in insights:
             total_flights = len(flight_data)
-            intl_percentage = ((total_flights - dutch_flights) / total_flights) * 100
+            intl_percentage = ((total_flights - insights['dutch_flights']) / total_flights) * 100
             print(f"  🌍 International flights: {intl_percentage:.1f}%")
     
     print()
@@ -2,15 +2,164 @@
 Local caching system for flight data using Parquet format
 """
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
+from collections.abc import Mapping
+
+try:
+    from numba import njit, types
+    from numba.typed import Dict
+except ImportError:  # numba is optional - fall back to pandas dedup
+    njit = None
+
+# Low-cardinality string columns worth dictionary-encoding on disk
+DICTIONARY_COLUMNS = ['origin_country', 'aircraft_type', 'callsign']
+
+# Compact in-memory dtypes for columns with known content (callsign stays a
+# plain string column: it is high-cardinality and analyzers fillna('') it)
+LOAD_DTYPES = {
+    'origin_country': 'category',
+    'aircraft_type': 'category',
+    'baro_altitude': 'float32',
+    'velocity': 'float32',
+    'true_track': 'float32'
+}
+
+# Per-row metadata columns written by older cache versions (now in the footer)
+LEGACY_META_COLUMNS = ['cache_timestamp', 'data_source', 'data_type']
+
+# Row count above which the compiled dedup kernel beats pandas' hashtable
+NUMBA_DEDUP_MIN_ROWS = 100_000
+
+
+# Timestamp embedded in cache filenames, e.g. opensky_current_20250731_120000
+_TS_RE = re.compile(r'(\d{8}_\d{6})')
+_TS_FMT = "%Y%m%d_%H%M%S"
+
+
+def _file_times(files: list) -> pd.Series:
+    """Parse the YYYYMMDD_HHMMSS stamp from each filename (NaT if absent)"""
+    names = pd.Series([f.name for f in files], dtype=object)
+    stamps = names.str.extract(_TS_RE, expand=False)
+    return pd.to_datetime(stamps, format=_TS_FMT, errors="coerce")
+
+
+def _scan_files(directory, suffix: str = ".parquet"):
+    """Recursively yield DirEntry objects for files ending in suffix"""
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan_files(entry.path, suffix)
+            elif entry.name.endswith(suffix):
+                yield entry
+
+
+def _packed_keys(icao24, data_time):
+    """
+    Pack (icao24, data_time) into one uint64 per row for fast dedup
+    
+    The 24-bit ICAO address goes in the high bits and whole seconds since
+    the epoch in the low 40 bits. Returns None if the data doesn't fit that
+    layout (non-hex addresses, sub-second or missing timestamps).
+    """
+    times = pd.to_datetime(data_time).to_numpy()
+    if pd.isna(times).any():
+        return None
+    seconds = times.astype('datetime64[s]')
+    if (seconds != times).any():
+        return None
+    secs = seconds.astype(np.int64)
+    if (secs < 0).any() or (secs >= 1 << 40).any():
+        return None
+    
+    try:
+        icao = np.fromiter((int(x, 16) for x in icao24), dtype=np.uint64, count=len(icao24))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if (icao >= 1 << 24).any():
+        return None
+    
+    return (icao << np.uint64(40)) | secs.astype(np.uint64)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _unique_mask(keys):
+        """Mark the first occurrence of each packed key"""
+        seen = Dict.empty(key_type=types.uint64, value_type=types.uint8)
+        out = np.ones(keys.size, np.bool_)
+        for i in range(keys.size):
+            k = keys[i]
+            if k in seen:
+                out[i] = False
+            else:
+                seen[k] = 1
+        return out
+
+
+def _drop_repeated_rows(tables: list):
+    """
+    Drop repeated (icao24, data_time) rows file by file, before concatenating
+    
+    Keeps the first occurrence in table order, the same rows _dedup_table
+    keeps on the concatenation, but overlapping cache files never get copied
+    into the combined table. Returns None if any table's keys can't be packed.
+    """
+    keys = []
+    for table in tables:
+        if 'icao24' not in table.column_names or 'data_time' not in table.column_names:
+            return None
+        table_keys = _packed_keys(table['icao24'].to_numpy(), table['data_time'].to_numpy())
+        if table_keys is None:
+            return None
+        keys.append(table_keys)
+    
+    all_keys = np.concatenate(keys)
+    if njit is not None and len(all_keys) >= NUMBA_DEDUP_MIN_ROWS:
+        first = _unique_mask(all_keys)
+    else:
+        first = ~pd.Index(all_keys).duplicated()
+    
+    masks = np.split(first, np.cumsum([len(k) for k in keys])[:-1])
+    return [table if mask.all() else table.filter(pa.array(mask))
+            for table, mask in zip(tables, masks)]
+
+
+def _dedup_table(table: pa.Table) -> pa.Table:
+    """Drop repeated (icao24, data_time) rows inside Arrow, keeping the first"""
+    if 'icao24' not in table.column_names or 'data_time' not in table.column_names:
+        return table
+    
+    keys = _packed_keys(table['icao24'].to_numpy(), table['data_time'].to_numpy())
+    if keys is not None:
+        if njit is not None and len(keys) >= NUMBA_DEDUP_MIN_ROWS:
+            return table.filter(pa.array(_unique_mask(keys)))
+        return table.filter(pa.array(~pd.Index(keys).duplicated()))
+    
+    # Generic path: first row index per key via Arrow's hash aggregation
+    first_rows = (
+        table.select(['icao24', 'data_time'])
+        .append_column('_row', pa.array(np.arange(table.num_rows)))
+        .group_by(['icao24', 'data_time'], use_threads=False)
+        .aggregate([('_row', 'min')])['_row_min']
+    )
+    return table.take(pc.take(first_rows, pc.array_sort_indices(first_rows)))
 
 
 class FlightCache:
     """Manages local Parquet cache for flight data"""
     
+    # Cache directories already created in this process
+    _created = set()
+    
     def __init__(self, cache_dir: str = "flight_cache"):
         """
         Initialize cache manager
@@ -19,15 +168,35 @@ class FlightCache:
             cache_dir: Directory for storing cached data
         """
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
         
         # Subdirectories for different data types
         self.opensky_dir = self.cache_dir / "opensky"
         self.adsb_dir = self.cache_dir / "adsb" 
         self.analysis_dir = self.cache_dir / "analysis"
         
-        for dir_path in [self.opensky_dir, self.adsb_dir, self.analysis_dir]:
-            dir_path.mkdir(exist_ok=True)
+        if self.cache_dir.absolute() not in FlightCache._created:
+            for dir_path in [self.cache_dir, self.opensky_dir, self.adsb_dir, self.analysis_dir]:
+                dir_path.mkdir(exist_ok=True)
+            FlightCache._created.add(self.cache_dir.absolute())
+        
+        # Directory listings keyed by (dir, pattern) -> (dir mtime_ns, files)
+        self._listing = {}
+    
+    def _listing_cached(self, directory: Path, pattern: str = "*.parquet") -> list:
+        """List files matching pattern, rescanning only when the directory changes"""
+        mtime_ns = directory.stat().st_mtime_ns
+        cached = self._listing.get((directory, pattern))
+        if cached is None or cached[0] != mtime_ns:
+            cached = (mtime_ns, list(directory.glob(pattern)))
+            self._listing[(directory, pattern)] = cached
+        return cached[1]
+    
+    def _all_files(self, pattern: str = "*.parquet") -> list:
+        """Files matching pattern across the cache root and its subdirectories"""
+        files = []
+        for dir_path in [self.cache_dir, self.opensky_dir, self.adsb_dir, self.analysis_dir]:
+            files.extend(self._listing_cached(dir_path, pattern))
+        return files
     
     def save_opensky_data(self, df: pd.DataFrame, data_type: str = "current") -> str:
         """
@@ -44,20 +213,11 @@ class FlightCache:
             print("No data to cache")
             return None
             
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = datetime.now()
+        timestamp = now.strftime(_TS_FMT)
         filename = f"opensky_{data_type}_{timestamp}.parquet"
         filepath = self.opensky_dir / filename
         
-        # Add metadata
-        df_with_meta = df.copy()
-        df_with_meta['cache_timestamp'] = datetime.now()
-        df_with_meta['data_source'] = 'opensky'
-        df_with_meta['data_type'] = data_type
-        
-        df_with_meta.to_parquet(filepath, index=False)
-        print(f"Cached {len(df)} records to {filepath}")
-        
-        # Save metadata file
         metadata = {
             'filename': filename,
             'timestamp': timestamp,
@@ -70,128 +230,233 @@ class FlightCache:
             }
         }
         
-        metadata_file = self.opensky_dir / f"{filename}.meta.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
-            
+        # Attach metadata to the schema instead of copying the frame or
+        # writing a sidecar file (see read_metadata)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'cache_timestamp': now.isoformat().encode(),
+            b'data_source': b'opensky',
+            b'data_type': data_type.encode(),
+            b'flightcache_meta': json.dumps(metadata).encode()
+        })
+        
+        pq.write_table(
+            table, filepath,
+            compression='zstd',
+            compression_level=3,
+            use_dictionary=[c for c in DICTIONARY_COLUMNS if c in df.columns]
+        )
+        print(f"Cached {len(df)} records to {filepath}")
+        
+        self._listing.clear()
         return str(filepath)
     
-    def load_opensky_data(self, hours_back: int = 24) -> pd.DataFrame:
+    @staticmethod
+    def read_metadata(path) -> dict:
+        """
+        Read the metadata stored in a cache file's parquet footer
+        
+        Falls back to the .meta.json sidecar written by older versions.
+        
+        Args:
+            path: Path to a cached parquet file
+            
+        Returns:
+            Metadata dict, or None if the file has none
+        """
+        schema_meta = pq.read_schema(path).metadata or {}
+        if b'flightcache_meta' in schema_meta:
+            return json.loads(schema_meta[b'flightcache_meta'])
+        
+        sidecar = Path(f"{path}.meta.json")
+        if sidecar.exists():
+            with open(sidecar) as f:
+                return json.load(f)
+        return None
+    
+    def load_opensky_data(self, hours_back: int = 24, columns: list = None) -> pd.DataFrame:
         """
         Load recent OpenSky data from cache
         
         Args:
             hours_back: Load data from last N hours
+            columns: Only read these columns (plus the icao24/data_time dedup
+                keys); all columns if None
             
         Returns:
             Combined DataFrame of cached data
         """
         cutoff_time = datetime.now() - timedelta(hours=hours_back)
         
-        parquet_files = list(self.opensky_dir.glob("*.parquet"))
-        recent_files = []
+        parquet_files = self._listing_cached(self.opensky_dir)
         
-        for file in parquet_files:
-            # Extract timestamp from filename
-            try:
-                timestamp_str = file.stem.split('_')[-2] + '_' + file.stem.split('_')[-1]
-                file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                if file_time >= cutoff_time:
-                    recent_files.append(file)
-            except (ValueError, IndexError):
-                continue
+        # Parse all filename timestamps in one vectorized pass
+        mask = _file_times(parquet_files) >= pd.Timestamp(cutoff_time)
+        recent_files = [f for f, keep in zip(parquet_files, mask) if keep]
         
         if not recent_files:
             print(f"No cached data found within {hours_back} hours")
             return pd.DataFrame()
         
-        # Load and combine data
-        dfs = []
-        for file in recent_files:
-            try:
-                df = pd.read_parquet(file)
-                dfs.append(df)
-            except Exception as e:
-                print(f"Error loading {file}: {e}")
-                continue
+        # data_time is UTC: naive in files from OpenSkyFetcher, tz-aware in
+        # some others (_read_cache_file matches the cutoff to each file)
+        utc_cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+        
+        # Read files in parallel - parquet decoding releases the GIL
+        with ThreadPoolExecutor(max_workers=min(8, len(recent_files))) as ex:
+            tables = [t for t in ex.map(lambda f: self._read_cache_file(f, utc_cutoff, columns),
+                                        recent_files)
+                      if t is not None]
         
-        if not dfs:
+        if not tables:
             return pd.DataFrame()
-            
-        combined_df = pd.concat(dfs, ignore_index=True)
         
-        # Remove duplicates based on icao24 and timestamp
-        if 'icao24' in combined_df.columns and 'data_time' in combined_df.columns:
-            combined_df = combined_df.drop_duplicates(subset=['icao24', 'data_time'])
+        # Remove duplicates based on icao24 and timestamp before leaving Arrow;
+        # repeats from overlapping snapshots are skipped before the concat
+        unique_tables = _drop_repeated_rows(tables)
+        deduped = unique_tables is not None
+        table = pa.concat_tables(unique_tables if deduped else tables,
+                                 promote_options="permissive")
+        del tables, unique_tables
+        
+        if not deduped:
+            table = _dedup_table(table)
+        
+        # One block per column lets Arrow hand buffers to numpy without
+        # consolidating (copying) them into 2-D blocks
+        combined_df = table.to_pandas(self_destruct=True, split_blocks=True)
+        del table
+        
+        combined_df = combined_df.astype(
+            {col: dtype for col, dtype in LOAD_DTYPES.items() if col in combined_df.columns}
+        )
         
         print(f"Loaded {len(combined_df)} records from {len(recent_files)} cache files")
         return combined_df
     
-    def get_cache_stats(self) -> dict:
-        """Get statistics about cached data"""
+    def _read_cache_file(self, path: Path, utc_cutoff: datetime, wanted: list = None):
+        """Read one cache file as an Arrow table, skipping row groups before the (tz-aware UTC) cutoff"""
+        try:
+            schema = pq.read_schema(path)
+            names = schema.names
+            columns = [c for c in names if c not in LEGACY_META_COLUMNS]
+            if wanted is not None:
+                # Parquet is columnar - unread columns are never decoded
+                keep = {'icao24', 'data_time', *wanted}
+                columns = [c for c in columns if c in keep]
+            
+            filters = None
+            if 'data_time' in names:
+                time_type = schema.field('data_time').type
+                # Naive timestamps compare against a naive UTC cutoff
+                naive = pa.types.is_timestamp(time_type) and time_type.tz is None
+                cutoff = utc_cutoff.replace(tzinfo=None) if naive else utc_cutoff
+                filters = [('data_time', '>=', cutoff)]
+            
+            try:
+                table = pq.read_table(path, columns=columns, filters=filters)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, TypeError) as e:
+                if filters is None:
+                    raise
+                # data_time can't be compared with the cutoff (e.g. stored as
+                # text) - read the whole file rather than dropping it
+                print(f"Time filter not applicable to {path}, reading all rows: {e}")
+                table = pq.read_table(path, columns=columns)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return None
+        
+        # Frames saved with category columns come back dictionary-typed;
+        # decode them so they concatenate with files saved from plain frames
+        if any(pa.types.is_dictionary(f.type) for f in table.schema):
+            table = table.cast(pa.schema(
+                [f.with_type(f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                 for f in table.schema],
+                metadata=table.schema.metadata
+            ))
+        return table
+    
+    def get_cache_stats(self) -> Mapping:
+        """
+        Get statistics about cached data
+        
+        Fields are computed on first access, so callers that only need the
+        file counts never walk the whole cache tree.
+        """
+        return _LazyStats(self)
+    
+    def _scan_stats(self) -> dict:
+        """Total size and oldest/newest file across the whole cache tree"""
+        # One recursive walk; DirEntry carries the name and caches its stat
+        all_files = list(_scan_files(self.cache_dir))
+        
         stats = {
-            'opensky_files': len(list(self.opensky_dir.glob("*.parquet"))),
-            'adsb_files': len(list(self.adsb_dir.glob("*.parquet"))),
             'total_size_mb': 0,
             'oldest_file': None,
             'newest_file': None
         }
         
-        all_files = list(self.cache_dir.rglob("*.parquet"))
-        
         if all_files:
             # Calculate total size
-            total_size = sum(f.stat().st_size for f in all_files)
+            total_size = sum(e.stat().st_size for e in all_files)
             stats['total_size_mb'] = round(total_size / (1024 * 1024), 2)
             
             # Find oldest and newest files
-            file_times = []
-            for f in all_files:
-                try:
-                    timestamp_str = f.stem.split('_')[-2] + '_' + f.stem.split('_')[-1]
-                    file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    file_times.append((file_time, f.name))
-                except (ValueError, IndexError):
-                    continue
-            
-            if file_times:
-                file_times.sort()
-                stats['oldest_file'] = file_times[0][1]
-                stats['newest_file'] = file_times[-1][1]
+            file_times = _file_times(all_files)
+            if file_times.notna().any():
+                stats['oldest_file'] = all_files[file_times.idxmin()].name
+                stats['newest_file'] = all_files[file_times.idxmax()].name
         
         return stats
     
     def cleanup_old_files(self, days_old: int = 7):
         """Remove cache files older than specified days"""
-        cutoff_time = datetime.now() - timedelta(days=days_old)
+        cutoff_ns = int((datetime.now() - timedelta(days=days_old)).timestamp() * 1e9)
         
-        all_files = list(self.cache_dir.rglob("*.parquet")) + list(self.cache_dir.rglob("*.json"))
+        all_files = self._all_files("*.parquet") + self._all_files("*.json")
         removed_count = 0
         
+        # Files are written once, so modification time is the cache time
         for file in all_files:
-            try:
-                # Try to extract timestamp from filename
-                if '_' in file.stem:
-                    timestamp_str = file.stem.split('_')[-2] + '_' + file.stem.split('_')[-1]
-                    timestamp_str = timestamp_str.replace('.meta', '')  # Handle metadata files
-                    file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    
-                    if file_time < cutoff_time:
-                        file.unlink()
-                        removed_count += 1
-                        print(f"Removed old file: {file.name}")
-            except (ValueError, IndexError):
-                # If we can't parse the timestamp, check file modification time
-                if datetime.fromtimestamp(file.stat().st_mtime) < cutoff_time:
-                    file.unlink()
-                    removed_count += 1
-                    print(f"Removed old file: {file.name}")
-                continue
+            if file.stat().st_mtime_ns < cutoff_ns:
+                file.unlink()
+                removed_count += 1
+                print(f"Removed old file: {file.name}")
         
+        self._listing.clear()
         print(f"Cleaned up {removed_count} old files")
         return removed_count
 
 
+class _LazyStats(Mapping):
+    """Read-only cache statistics, each group computed on first access"""
+    
+    _KEYS = ('opensky_files', 'adsb_files', 'total_size_mb', 'oldest_file', 'newest_file')
+    
+    def __init__(self, cache: FlightCache):
+        self._cache = cache
+        self._values = {}
+    
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key == 'opensky_files':
+                self._values[key] = len(self._cache._listing_cached(self._cache.opensky_dir))
+            elif key == 'adsb_files':
+                self._values[key] = len(self._cache._listing_cached(self._cache.adsb_dir))
+            elif key in self._KEYS:
+                self._values.update(self._cache._scan_stats())
+            else:
+                raise KeyError(key)
+        return self._values[key]
+    
+    def __iter__(self):
+        return iter(self._KEYS)
+    
+    def __len__(self):
+        return len(self._KEYS)
+
+
 if __name__ == "__main__":
     # Test the cache manager
     cache = FlightCache()
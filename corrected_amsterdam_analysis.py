@@ -3,18 +3,27 @@
 CORRECTED Amsterdam Noord Flight Analysis 
 Implements proper time-series collection methodology
 """
+import asyncio
+import io
 import json
 import sys
 import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
 import argparse
 from datetime import datetime, timedelta
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # Import our modules
 from opensky_fetcher import OpenSkyFetcher
 from schiphol_analyzer import SchipholFlightAnalyzer
 from cache_manager import FlightCache
+from spatial_kernels import LatSortedIndex, count_within_bbox
 
 
 def load_credentials():
@@ -31,6 +40,25 @@ def load_credentials():
         return {}
 
 
+# Compact dtypes for snapshot frames (low-cardinality strings -> category)
+SNAPSHOT_DTYPES = {
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'baro_altitude': 'float32',
+    'origin_country': 'category',
+    'icao24': 'category'
+}
+
+# Columns analyze_collected_data (and the Schiphol analyzer it calls) reads
+ANALYSIS_COLUMNS = [
+    'icao24', 'callsign', 'origin_country', 'latitude', 'longitude',
+    'baro_altitude', 'data_time', 'snapshot_time', 'snapshot_id'
+]
+
+# Altitude band edges in feet (3000ft splits off the low-altitude count)
+ALTITUDE_EDGES = np.array([1000, 3000, 5000, 10000], dtype=np.float64)
+
+
 class CorrectedFlightCollector:
     """Corrected flight data collection with proper time-series methodology"""
     
@@ -54,15 +82,61 @@ class CorrectedFlightCollector:
             'lon_max': 4.95
         }
     
-    def collect_time_series_data(self, duration_minutes: int = 60, 
-                                interval_minutes: int = 5) -> pd.DataFrame:
+    @staticmethod
+    def _prepare_snapshot(flights: pd.DataFrame, snapshot_time: datetime, 
+                          snapshot_id: int, dataset_dir: Path = None) -> pa.Table:
+        """Normalize dtypes, tag and persist a snapshot (runs off the event loop)"""
+        flights = flights.astype(SNAPSHOT_DTYPES)
+        flights['snapshot_time'] = snapshot_time
+        flights['snapshot_id'] = snapshot_id
+        table = pa.Table.from_pandas(flights, preserve_index=False)
+        
+        # One partition per snapshot; lat/lon/altitude stay top-level columns
+        # so parquet keeps min/max statistics usable for bbox pruning
+        if dataset_dir is not None:
+            pq.write_to_dataset(
+                table,
+                root_path=str(dataset_dir),
+                partition_cols=['snapshot_id'],
+                compression='zstd',
+                write_statistics=True
+            )
+        return table
+    
+    @staticmethod
+    def load_snapshot_data(dataset_dir: Path, bounds: dict = None) -> pd.DataFrame:
+        """
+        Reload a persisted snapshot dataset for re-analysis
+        
+        Args:
+            dataset_dir: Directory written by collect_time_series_data
+            bounds: Optional lat/lon bounding box; pages outside it are skipped
+            
+        Returns:
+            DataFrame with the snapshot observations
+        """
+        filters = None
+        if bounds:
+            filters = [
+                ('latitude', '>=', bounds['lat_min']), ('latitude', '<=', bounds['lat_max']),
+                ('longitude', '>=', bounds['lon_min']), ('longitude', '<=', bounds['lon_max'])
+            ]
+        return pq.read_table(str(dataset_dir), filters=filters).to_pandas()
+    
+    async def collect_time_series_data(self, duration_minutes: int = 60, 
+                                       interval_minutes: int = 5,
+                                       dataset_dir: Path = None) -> pd.DataFrame:
         """
         Collect flight data over time using multiple API snapshots
         This is the CORRECT way to get "historical" patterns
         
+        The blocking API call runs in a worker thread and each snapshot's
+        post-processing overlaps with waiting for the next one.
+        
         Args:
             duration_minutes: How long to collect data
             interval_minutes: Time between snapshots
+            dataset_dir: Optional directory to persist snapshots as partitioned Parquet
             
         Returns:
             Combined DataFrame with time-series flight data
@@ -74,48 +148,68 @@ class CorrectedFlightCollector:
         creds = load_credentials()
         fetcher = OpenSkyFetcher(**creds)
         
-        # Set bounds for Schiphol area
-        fetcher.AMSTERDAM_NOORD_BOUNDS = self.schiphol_bounds
-        
-        all_flights = []
+        loop = asyncio.get_running_loop()
+        pending = []  # (snapshot number, post-processing future), in snapshot order
         snapshot_count = 0
-        start_time = datetime.now()
+        start_mono = time.monotonic()  # immune to wall-clock/NTP jumps
+        
+        # Single worker keeps post-processing serial and in order
+        with ThreadPoolExecutor(max_workers=1) as post_executor:
+            while True:
+                elapsed = (time.monotonic() - start_mono) / 60
+                if elapsed >= duration_minutes:
+                    break
+                    
+                try:
+                    snapshot_time = datetime.now()
+                    print(f"   📸 Snapshot {snapshot_count + 1} at {snapshot_time.strftime('%H:%M:%S')}")
+                    
+                    # Get current flight data without blocking the event loop
+                    flights = await loop.run_in_executor(
+                        None, fetcher.get_current_flights, self.schiphol_bounds
+                    )
+                    
+                    if not flights.empty:
+                        pending.append((snapshot_count, loop.run_in_executor(
+                            post_executor, self._prepare_snapshot,
+                            flights, snapshot_time, snapshot_count, dataset_dir
+                        )))
+                        print(f"      → {len(flights)} flights detected")
+                    else:
+                        print(f"      → 0 flights detected")
+                    
+                    snapshot_count += 1
+                    
+                    # Wait for next interval (unless this is the last snapshot)
+                    remaining_time = duration_minutes - elapsed
+                    if remaining_time > interval_minutes:
+                        print(f"   ⏱️  Waiting {interval_minutes} minutes for next snapshot...")
+                        await asyncio.sleep(interval_minutes * 60)
+                    
+                except Exception as e:
+                    print(f"   ❌ Error in snapshot {snapshot_count}: {e}")
+                    snapshot_count += 1
+                    if snapshot_count < duration_minutes // interval_minutes:
+                        await asyncio.sleep(30)  # Short wait before retry
+            
+            # A failed snapshot is reported and skipped, like a failed fetch
+            results = await asyncio.gather(*(future for _, future in pending),
+                                           return_exceptions=True)
         
-        while True:
-            elapsed = (datetime.now() - start_time).total_seconds() / 60
-            if elapsed >= duration_minutes:
-                break
-                
-            try:
-                print(f"   📸 Snapshot {snapshot_count + 1} at {datetime.now().strftime('%H:%M:%S')}")
-                
-                # Get current flight data
-                flights = fetcher.get_current_flights()
-                
-                if not flights.empty:
-                    flights['snapshot_time'] = datetime.now()
-                    flights['snapshot_id'] = snapshot_count
-                    all_flights.append(flights)
-                    print(f"      → {len(flights)} flights detected")
-                else:
-                    print(f"      → 0 flights detected")
-                
-                snapshot_count += 1
-                
-                # Wait for next interval (unless this is the last snapshot)
-                remaining_time = duration_minutes - elapsed
-                if remaining_time > interval_minutes:
-                    print(f"   ⏱️  Waiting {interval_minutes} minutes for next snapshot...")
-                    time.sleep(interval_minutes * 60)
-                
-            except Exception as e:
-                print(f"   ❌ Error in snapshot {snapshot_count}: {e}")
-                snapshot_count += 1
-                if snapshot_count < duration_minutes // interval_minutes:
-                    time.sleep(30)  # Short wait before retry
+        all_tables = []
+        for (snapshot_number, _), result in zip(pending, results):
+            if isinstance(result, Exception):
+                print(f"   ❌ Error in snapshot {snapshot_number}: {result}")
+            else:
+                all_tables.append(result)
         
-        if all_flights:
-            combined_df = pd.concat(all_flights, ignore_index=True)
+        if all_tables:
+            # Arrow chains the snapshot chunks without copying; category
+            # columns stay dictionary-encoded and unify on conversion
+            combined = pa.concat_tables(all_tables, promote_options="permissive")
+            del all_tables
+            combined_df = combined.to_pandas(self_destruct=True)
+            del combined
             print(f"\n✅ Collection complete: {len(combined_df)} total flight observations")
             print(f"   Unique aircraft: {combined_df['icao24'].nunique()}")
             print(f"   Time span: {combined_df['snapshot_time'].min().strftime('%H:%M')} - {combined_df['snapshot_time'].max().strftime('%H:%M')}")
@@ -125,86 +219,64 @@ class CorrectedFlightCollector:
             print("❌ No flight data collected")
             return pd.DataFrame()
     
-    def analyze_collected_data(self, flights_df: pd.DataFrame) -> dict:
-        """Analyze the collected time-series flight data"""
-        if flights_df.empty:
-            return {"error": "No data to analyze"}
-        
-        print("\n🧠 Analyzing collected flight data...")
-        
-        # Basic statistics
-        total_observations = len(flights_df)
-        unique_aircraft = flights_df['icao24'].nunique()
-        time_span = (flights_df['snapshot_time'].max() - flights_df['snapshot_time'].min()).total_seconds() / 3600
-        
-        # Identify flights over Amsterdam Noord specifically
-        noord_flights = flights_df[
-            (flights_df['latitude'] >= self.noord_bounds['lat_min']) &
-            (flights_df['latitude'] <= self.noord_bounds['lat_max']) &
-            (flights_df['longitude'] >= self.noord_bounds['lon_min']) &
-            (flights_df['longitude'] <= self.noord_bounds['lon_max'])
-        ]
-        
-        # Enhanced analysis using Schiphol analyzer
-        processed_flights = self.schiphol_analyzer.identify_schiphol_operations(flights_df)
+    @staticmethod
+    def analysis_view(flights_df: pd.DataFrame) -> pd.DataFrame:
+        """Project the full state vectors down to the narrow analysis table"""
+        columns = [c for c in ANALYSIS_COLUMNS if c in flights_df.columns]
+        return flights_df[columns].astype({'snapshot_id': 'int32'})
+    
+    @staticmethod
+    def altitude_summary(altitudes: np.ndarray) -> dict:
+        """
+        Summarize barometric altitudes in a single vectorized pass
         
-        analysis = {
-            "collection_summary": {
-                "total_observations": total_observations,
-                "unique_aircraft": unique_aircraft,
-                "time_span_hours": round(time_span, 2),
-                "observations_per_hour": round(total_observations / max(time_span, 0.1), 1),
-                "snapshots_taken": flights_df['snapshot_id'].nunique()
-            },
-            
-            "geographic_distribution": {
-                "total_schiphol_area": len(flights_df),
-                "amsterdam_noord_flights": len(noord_flights),
-                "noord_percentage": round((len(noord_flights) / len(flights_df)) * 100, 1) if len(flights_df) > 0 else 0
-            },
-            
-            "schiphol_operations": {
-                "operation_breakdown": processed_flights['schiphol_operation'].value_counts().to_dict(),
-                "approach_corridors": processed_flights['approach_corridor'].value_counts().to_dict(),
-                "confirmed_schiphol_ops": len(processed_flights[
-                    processed_flights['schiphol_operation'].isin([
-                        'Landing/Takeoff', 'Approach/Departure', 'Extended Approach'
-                    ])
-                ])
-            },
-            
-            "altitude_analysis": {
-                "mean_altitude": round(flights_df['baro_altitude'].mean(), 0),
-                "low_altitude_flights": len(flights_df[flights_df['baro_altitude'] < 3000]),
-                "altitude_distribution": {
-                    "0-1000ft": len(flights_df[flights_df['baro_altitude'] < 1000]),
-                    "1000-5000ft": len(flights_df[(flights_df['baro_altitude'] >= 1000) & (flights_df['baro_altitude'] < 5000)]),
-                    "5000-10000ft": len(flights_df[(flights_df['baro_altitude'] >= 5000) & (flights_df['baro_altitude'] < 10000)]),
-                    "10000ft+": len(flights_df[flights_df['baro_altitude'] >= 10000])
-                }
-            },
+        Args:
+            altitudes: Altitude per observation (NaN = unknown, ignored)
             
-            "aircraft_analysis": {
-                "countries": flights_df['origin_country'].value_counts().head(10).to_dict(),
-                "most_frequent_aircraft": flights_df['icao24'].value_counts().head(5).to_dict()
+        Returns:
+            Dictionary with mean/min/max, low-altitude (<3000ft) count and band counts
+        """
+        known = altitudes[~np.isnan(altitudes)]
+        # Bands are left-closed; the extra 3000ft edge yields the low-altitude count
+        bands = np.bincount(
+            np.searchsorted(ALTITUDE_EDGES, known, side='right'), minlength=len(ALTITUDE_EDGES) + 1
+        )
+        
+        return {
+            'mean': float(known.mean()) if known.size else float('nan'),
+            'min': float(known.min()) if known.size else float('nan'),
+            'max': float(known.max()) if known.size else float('nan'),
+            'low': int(bands[0] + bands[1]),
+            'distribution': {
+                '0-1000ft': int(bands[0]),
+                '1000-5000ft': int(bands[1] + bands[2]),
+                '5000-10000ft': int(bands[3]),
+                '10000ft+': int(bands[4])
             }
         }
+    
+    def analyze_collected_data(self, flights_df: pd.DataFrame) -> Mapping:
+        """
+        Analyze the collected time-series flight data
         
-        # Amsterdam Noord specific analysis
-        if not noord_flights.empty:
-            noord_analysis = self.schiphol_analyzer.analyze_residential_impact(
-                noord_flights, (52.40, 4.90), "1032"
-            )
-            analysis["amsterdam_noord_impact"] = noord_analysis
+        Returns:
+            Read-only mapping of report sections; each section is computed
+            the first time it is accessed
+        """
+        if flights_df.empty:
+            return {"error": "No data to analyze"}
         
-        return analysis
+        print("\n🧠 Analyzing collected flight data...")
+        return LazyAnalysis(self, flights_df)
     
-    def generate_corrected_report(self, analysis: dict) -> str:
+    def generate_corrected_report(self, analysis: Mapping) -> str:
         """Generate corrected analysis report"""
         if "error" in analysis:
             return f"Analysis Error: {analysis['error']}"
         
-        report = f"""
+        buf = io.StringIO()
+        w = buf.write
+        w(f"""
 ═══════════════════════════════════════════════════════════════════════
                 CORRECTED SCHIPHOL FLIGHT ANALYSIS
      Using Proper Time-Series Methodology (Multiple Snapshots)
@@ -229,55 +301,56 @@ Noord represents {analysis['geographic_distribution']['noord_percentage']}% of S
 ──────────────────────────────────────────────────────────────────────
 Confirmed Schiphol operations: {analysis['schiphol_operations']['confirmed_schiphol_ops']}
 
-Operation Types:"""
+Operation Types:""")
         
+        total_observations = analysis['collection_summary']['total_observations']
         for operation, count in analysis['schiphol_operations']['operation_breakdown'].items():
-            percentage = (count / analysis['collection_summary']['total_observations']) * 100
-            report += f"\n  • {operation}: {count} ({percentage:.1f}%)"
+            percentage = (count / total_observations) * 100
+            w(f"\n  • {operation}: {count} ({percentage:.1f}%)")
         
-        report += f"""
+        w(f"""
 
-Approach Corridors:"""
+Approach Corridors:""")
         
         for corridor, count in analysis['schiphol_operations']['approach_corridors'].items():
-            report += f"\n  • {corridor}: {count} flights"
+            w(f"\n  • {corridor}: {count} flights")
         
-        report += f"""
+        w(f"""
 
 📏 ALTITUDE ANALYSIS
 ──────────────────────────────────────────────────────────────────────
 Average altitude: {analysis['altitude_analysis']['mean_altitude']:.0f} feet
 Low altitude flights (<3000ft): {analysis['altitude_analysis']['low_altitude_flights']}
 
-Altitude Distribution:"""
+Altitude Distribution:""")
         
         for range_name, count in analysis['altitude_analysis']['altitude_distribution'].items():
-            report += f"\n  • {range_name}: {count} flights"
+            w(f"\n  • {range_name}: {count} flights")
         
-        report += f"""
+        w(f"""
 
 🌍 AIRCRAFT ORIGINS
-──────────────────────────────────────────────────────────────────────"""
+──────────────────────────────────────────────────────────────────────""")
         
         for country, count in list(analysis['aircraft_analysis']['countries'].items())[:5]:
-            report += f"\n  • {country}: {count} flights"
+            w(f"\n  • {country}: {count} flights")
         
         # Amsterdam Noord specific impact
         if "amsterdam_noord_impact" in analysis:
             noord = analysis["amsterdam_noord_impact"]
-            report += f"""
+            w(f"""
 
 🏠 AMSTERDAM NOORD 1032 IMPACT ANALYSIS
 ──────────────────────────────────────────────────────────────────────
-Total flights over your area: {noord.get('total_flights', 0)}"""
+Total flights over your area: {noord.get('total_flights', 0)}""")
             
             if noord.get('total_flights', 0) > 0:
                 noise = noord.get('noise_analysis', {})
-                report += f"""
+                w(f"""
 Average noise level: {noise.get('average_noise_level', 'N/A')} dB
-High impact flights (≥65dB): {noise.get('high_impact_flights', 0)}"""
+High impact flights (≥65dB): {noise.get('high_impact_flights', 0)}""")
         
-        report += f"""
+        w(f"""
 
 💡 KEY INSIGHTS
 ──────────────────────────────────────────────────────────────────────
@@ -292,9 +365,127 @@ High impact flights (≥65dB): {noise.get('high_impact_flights', 0)}"""
 • This analysis collects multiple "current" snapshots over time (correct approach)
 • 40-50 flights per snapshot is EXCELLENT for Schiphol area
 • This scales to ~1,000-1,500 unique flights per day (matches Schiphol statistics)
-"""
+""")
         
-        return report
+        return buf.getvalue()
+
+
+class LazyAnalysis(Mapping):
+    """Sections of a time-series analysis, each computed on first access"""
+    
+    SECTIONS = (
+        'collection_summary', 'geographic_distribution', 'schiphol_operations',
+        'altitude_analysis', 'aircraft_analysis', 'amsterdam_noord_impact'
+    )
+    
+    def __init__(self, collector: CorrectedFlightCollector, flights_df: pd.DataFrame):
+        self._collector = collector
+        self._flights = flights_df
+    
+    def __getitem__(self, key):
+        # The Noord impact section only exists when flights crossed Noord
+        if key in self.SECTIONS and (key != 'amsterdam_noord_impact' or self._area_counts[1]):
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return (key for key in self.SECTIONS if key in self)
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    @cached_property
+    def _positions(self):
+        return self._flights['latitude'].to_numpy(), self._flights['longitude'].to_numpy()
+    
+    @cached_property
+    def _area_counts(self):
+        # Count flights per monitoring area in one pass over the positions
+        lat, lon = self._positions
+        areas = [self._collector.schiphol_bounds, self._collector.noord_bounds]
+        return count_within_bbox(
+            lat, lon, *([area[edge] for area in areas]
+                        for edge in ('lat_min', 'lat_max', 'lon_min', 'lon_max'))
+        )
+    
+    @cached_property
+    def _operation_counts(self):
+        processed_flights = self._collector.schiphol_analyzer.identify_schiphol_operations(
+            self._flights, memoize=True
+        )
+        return (processed_flights['schiphol_operation'].value_counts(),
+                processed_flights['approach_corridor'].value_counts())
+    
+    @cached_property
+    def collection_summary(self) -> dict:
+        flights_df = self._flights
+        total_observations = len(flights_df)
+        time_span = (flights_df['snapshot_time'].max() - flights_df['snapshot_time'].min()).total_seconds() / 3600
+        
+        return {
+            "total_observations": total_observations,
+            "unique_aircraft": flights_df['icao24'].nunique(),
+            "time_span_hours": round(time_span, 2),
+            "observations_per_hour": round(total_observations / max(time_span, 0.1), 1),
+            "snapshots_taken": flights_df['snapshot_id'].nunique()
+        }
+    
+    @cached_property
+    def geographic_distribution(self) -> dict:
+        schiphol_count, noord_count = (int(n) for n in self._area_counts)
+        total = len(self._flights)
+        return {
+            "total_schiphol_area": total,
+            "amsterdam_noord_flights": noord_count,
+            "noord_percentage": round((noord_count / total) * 100, 1) if total > 0 else 0,
+            # Observations actually inside the Schiphol box (the collected
+            # data can include positions just outside it)
+            "schiphol_bbox_flights": schiphol_count
+        }
+    
+    @cached_property
+    def schiphol_operations(self) -> dict:
+        operations, corridors = self._operation_counts
+        confirmed_ops = operations.reindex(
+            ['Landing/Takeoff', 'Approach/Departure', 'Extended Approach'], fill_value=0
+        ).sum()
+        
+        return {
+            "operation_breakdown": operations.to_dict(),
+            "approach_corridors": corridors.to_dict(),
+            "confirmed_schiphol_ops": int(confirmed_ops)
+        }
+    
+    @cached_property
+    def altitude_analysis(self) -> dict:
+        # Altitude stats, bands and the low-altitude count from one pass
+        altitude = self._collector.altitude_summary(self._flights['baro_altitude'].to_numpy(dtype=np.float64))
+        return {
+            "mean_altitude": round(altitude['mean'], 0),
+            "min_altitude": altitude['min'],
+            "max_altitude": altitude['max'],
+            "low_altitude_flights": altitude['low'],
+            "altitude_distribution": altitude['distribution']
+        }
+    
+    @cached_property
+    def aircraft_analysis(self) -> dict:
+        # High-cardinality columns are counted unsorted; nlargest picks the top
+        return {
+            "countries": self._flights['origin_country'].value_counts(sort=False).nlargest(10).to_dict(),
+            "most_frequent_aircraft": self._flights['icao24'].value_counts(sort=False).nlargest(5).to_dict()
+        }
+    
+    @cached_property
+    def amsterdam_noord_impact(self) -> dict:
+        # Identify flights over Amsterdam Noord specifically via a spatial
+        # index built over all snapshots
+        noord_flights = self._flights.iloc[
+            LatSortedIndex(*self._positions).query(**self._collector.noord_bounds)
+        ]
+        return self._collector.schiphol_analyzer.analyze_residential_impact(
+            noord_flights, (52.40, 4.90), "1032"
+        )
 
 
 def main():
@@ -324,12 +515,15 @@ def main():
     print()
     
     collector = CorrectedFlightCollector()
+    run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    snapshot_dir = Path(f"corrected_analysis_{run_stamp}_snapshots")
     
     # Collect time-series data
-    flights_data = collector.collect_time_series_data(
+    flights_data = asyncio.run(collector.collect_time_series_data(
         duration_minutes=args.duration,
-        interval_minutes=args.interval
-    )
+        interval_minutes=args.interval,
+        dataset_dir=snapshot_dir
+    ))
     
     if flights_data.empty:
         print("❌ No data collected - analysis cannot proceed")
@@ -339,18 +533,21 @@ def main():
     collector.cache.save_opensky_data(flights_data, "corrected_timeseries")
     
     # Analyze the data
-    analysis_results = collector.analyze_collected_data(flights_data)
+    analysis_results = collector.analyze_collected_data(collector.analysis_view(flights_data))
     
     # Generate and display report
     report = collector.generate_corrected_report(analysis_results)
     print(report)
     
-    # Save detailed results
-    results_file = f"corrected_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    # Save the summary; raw observations live in the Parquet snapshot dataset
+    analysis_results = dict(analysis_results)
+    analysis_results["snapshot_dataset"] = str(snapshot_dir)
+    results_file = f"corrected_analysis_{run_stamp}.json"
     with open(results_file, 'w') as f:
         json.dump(analysis_results, f, indent=2, default=str)
     
     print(f"📄 Detailed results saved to: {results_file}")
+    print(f"📦 Snapshot data saved to: {snapshot_dir}/")
 
 
 if __name__ == "__main__":
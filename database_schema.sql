@@ -99,6 +99,13 @@ CREATE TABLE monitoring.data_quality_issues (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- ETL progress: last source row id loaded per pipeline (avoids MAX(id) scans)
+CREATE TABLE flight_data.etl_watermark (
+    name VARCHAR(50) PRIMARY KEY,
+    last_id BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- Indexes for performance
 CREATE INDEX idx_flights_collection_time ON flight_data.flights(collection_time);
 CREATE INDEX idx_flights_icao24_time ON flight_data.flights(icao24, collection_time);
@@ -107,6 +114,10 @@ CREATE INDEX idx_flights_noise_analysis ON flight_data.flights(estimated_noise_d
 CREATE INDEX idx_flights_house_proximity ON flight_data.flights(is_over_house, distance_to_house_km);
 CREATE INDEX idx_flights_temporal ON flight_data.flights(hour_of_day, day_of_week, is_weekend);
 
+-- Partial index over the Amsterdam Noord box (must match NOORD_FLIGHTS_QUERY in etl_pipeline.py)
+CREATE INDEX idx_flights_noord ON flight_data.flights(collection_time)
+    WHERE latitude BETWEEN 52.37 AND 52.43 AND longitude BETWEEN 4.85 AND 4.95;
+
 -- Spatial index for future geographic analysis
 CREATE INDEX idx_demographic_zones_geom ON analysis.demographic_zones USING GIST(geometry);
 
@@ -17,6 +17,7 @@ mkdir -p $DEPLOY_DIR
 echo "📋 Copying essential files..."
 cp opensky_fetcher.py $DEPLOY_DIR/
 cp schiphol_analyzer.py $DEPLOY_DIR/
+cp spatial_kernels.py $DEPLOY_DIR/
 cp cache_manager.py $DEPLOY_DIR/
 cp two_week_flight_collector.py $DEPLOY_DIR/
 cp requirements.txt $DEPLOY_DIR/
@@ -24,6 +25,7 @@ cp requirements.txt $DEPLOY_DIR/
 # Create production requirements (minimal)
 cat > $DEPLOY_DIR/requirements_prod.txt << 'EOF'
 requests>=2.32.3
+httpx>=0.28.1
 pandas>=2.3.1
 geopy>=2.4.1
 schedule>=1.2.2
@@ -3,19 +3,27 @@
 Enhanced Amsterdam Noord 1032 Flight Analysis with Schiphol Traffic Integration
 Combines local residential impact analysis with broader Schiphol operations insight
 """
+import io
 import json
 import sys
 from pathlib import Path
 import argparse
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 # Import our enhanced modules
 from opensky_fetcher import OpenSkyFetcher
 from postal_code_fetcher import PostalCodeFetcher, AmsterdamAreas
-from schiphol_analyzer import SchipholFlightAnalyzer
+from schiphol_analyzer import SchipholFlightAnalyzer, SCHIPHOL_OPERATION_TYPES, CONFIRMED_SCHIPHOL_OPERATIONS
 from flight_analyzer import FlightAnalyzer  
 from cache_manager import FlightCache
+from spatial_kernels import count_within_bbox, warm_up
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the stdlib encoder
+    orjson = None
 
 
 def load_credentials(cred_path: str = None) -> dict:
@@ -66,6 +74,19 @@ def load_credentials(cred_path: str = None) -> dict:
         return {}
 
 
+def category_counts(values: pd.Series, categories: list) -> pd.Series:
+    """
+    Count values of a column with a known, fixed set of categories
+    
+    Counts via integer category codes; values outside the categories are
+    ignored. Returns the non-zero counts, most frequent first (like
+    value_counts).
+    """
+    codes = pd.Index(categories).get_indexer(values)
+    counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(categories)), index=categories)
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
 class EnhancedAmsterdamAnalysis:
     """Enhanced analysis combining local 1032 area with broader Schiphol operations"""
     
@@ -80,6 +101,9 @@ class EnhancedAmsterdamAnalysis:
         self.schiphol_analyzer = SchipholFlightAnalyzer()
         self.flight_analyzer = FlightAnalyzer()
         
+        # Compile the numeric kernels (if numba is installed) before the first fetch
+        warm_up()
+        
         # Get precise postal code info
         self.pc_info = self.areas.analyze_postcode_vs_schiphol(postcode)
         
@@ -101,19 +125,8 @@ class EnhancedAmsterdamAnalysis:
         """
         print("🔍 Fetching flight data for dual analysis...")
         
-        # 1. Get local area flights (existing functionality)
-        if mode == "current":
-            local_flights = fetcher.get_current_flights()
-        else:
-            local_flights = fetcher.get_historical_flights(1)
-        
-        # 2. Get broader Schiphol approach area flights
-        print("🛫 Fetching Schiphol approach area flights...")
-        
-        # Temporarily expand search area for Schiphol operations
-        original_bounds = fetcher.AMSTERDAM_NOORD_BOUNDS.copy()
-        
-        # Expand to cover Schiphol approach corridors
+        # Expand to cover Schiphol approach corridors; the local area lies
+        # inside this box, so one API call serves both views
         schiphol_approach_bounds = {
             'lat_min': 52.0,   # South of Schiphol
             'lat_max': 52.7,   # North of Amsterdam 
@@ -121,16 +134,22 @@ class EnhancedAmsterdamAnalysis:
             'lon_max': 5.2     # East of Amsterdam
         }
         
-        fetcher.AMSTERDAM_NOORD_BOUNDS = schiphol_approach_bounds
+        print("🛫 Fetching Schiphol approach area flights...")
+        if mode == "current":
+            schiphol_flights = fetcher.get_current_flights(bounds=schiphol_approach_bounds)
+        else:
+            schiphol_flights = fetcher.get_historical_flights(1, bounds=schiphol_approach_bounds)
         
-        try:
-            if mode == "current":
-                schiphol_flights = fetcher.get_current_flights()
-            else:
-                schiphol_flights = fetcher.get_historical_flights(1)
-        finally:
-            # Restore original bounds
-            fetcher.AMSTERDAM_NOORD_BOUNDS = original_bounds
+        # Slice the local area (existing functionality) out of the superset
+        if schiphol_flights.empty:
+            local_flights = pd.DataFrame()
+        else:
+            local = fetcher.AMSTERDAM_NOORD_BOUNDS
+            lat_min, lat_max, lon_min, lon_max = (local[k] for k in ('lat_min', 'lat_max', 'lon_min', 'lon_max'))
+            lat = schiphol_flights['latitude'].to_numpy()
+            lon = schiphol_flights['longitude'].to_numpy()
+            local_mask = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+            local_flights = schiphol_flights[local_mask].reset_index(drop=True)
         
         print(f"📊 Local area flights: {len(local_flights) if not local_flights.empty else 0}")
         print(f"📊 Schiphol area flights: {len(schiphol_flights) if not schiphol_flights.empty else 0}")
@@ -138,9 +157,21 @@ class EnhancedAmsterdamAnalysis:
         return local_flights, schiphol_flights
     
     def analyze_comprehensive(self, local_flights: pd.DataFrame, 
-                            schiphol_flights: pd.DataFrame) -> dict:
+                            schiphol_flights: pd.DataFrame,
+                            noord_flights: pd.DataFrame = None) -> dict:
         """
         Perform comprehensive analysis combining local and Schiphol perspectives
+        
+        Args:
+            local_flights: Flights over the target postal code area
+            schiphol_flights: Flights in the wider Schiphol approach area
+            noord_flights: Flights over the Noord region already filtered by the
+                           database (last 24h). When given, flights_over_noord
+                           counts these rows instead of the Noord box count over
+                           schiphol_flights, so that one metric comes from
+                           PostgreSQL while the others come from the frames
+                           passed in. The box count still runs, as the same
+                           pass yields the overhead count.
         """
         analysis_results = {
             "timestamp": datetime.now().isoformat(),
@@ -161,28 +192,35 @@ class EnhancedAmsterdamAnalysis:
         # 2. Schiphol operations analysis (broader traffic patterns)
         print("✈️  Analyzing Schiphol traffic patterns...")
         if not schiphol_flights.empty:
+            # Noord region and ±0.01° around the target, counted in one pass
+            target_lat, target_lon = self.target_coords
+            noord_count, overhead_count = count_within_bbox(
+                schiphol_flights['latitude'].to_numpy(),
+                schiphol_flights['longitude'].to_numpy(),
+                lat_min=[52.37, target_lat - 0.01], lat_max=[52.43, target_lat + 0.01],
+                lon_min=[4.85, target_lon - 0.01], lon_max=[4.95, target_lon + 0.01]
+            )
+            
             # Process Schiphol flights
             processed_schiphol = self.schiphol_analyzer.identify_schiphol_operations(schiphol_flights)
             
-            # Filter for actual Schiphol operations
-            schiphol_ops = processed_schiphol[
-                processed_schiphol['schiphol_operation'].isin([
-                    'Landing/Takeoff', 'Approach/Departure', 'Extended Approach'
-                ])
-            ]
+            # One code-based count per column; confirmed operations are
+            # summed from the same counts instead of filtering the frame
+            operation_counts = category_counts(processed_schiphol['schiphol_operation'], SCHIPHOL_OPERATION_TYPES)
+            corridor_counts = category_counts(
+                processed_schiphol['approach_corridor'],
+                list(self.schiphol_analyzer.approach_corridors) + ['Other', 'Unknown']
+            )
             
             schiphol_analysis = {
                 "total_area_flights": len(schiphol_flights),
-                "schiphol_operations": len(schiphol_ops),
-                "operation_breakdown": processed_schiphol['schiphol_operation'].value_counts().to_dict(),
-                "approach_corridors": processed_schiphol['approach_corridor'].value_counts().to_dict(),
-                "average_altitude": round(schiphol_flights['baro_altitude'].mean(), 0) if 'baro_altitude' in schiphol_flights.columns else None,
-                "flights_over_noord": len(schiphol_flights[
-                    (schiphol_flights['latitude'] >= 52.37) & 
-                    (schiphol_flights['latitude'] <= 52.43) &
-                    (schiphol_flights['longitude'] >= 4.85) &
-                    (schiphol_flights['longitude'] <= 4.95)
-                ])
+                "schiphol_operations": int(operation_counts.reindex(CONFIRMED_SCHIPHOL_OPERATIONS, fill_value=0).sum()),
+                "operation_breakdown": {op: int(n) for op, n in operation_counts.items()},
+                "approach_corridors": {corridor: int(n) for corridor, n in corridor_counts.items()},
+                "average_altitude": round(float(np.nanmean(
+                    schiphol_flights['baro_altitude'].to_numpy(dtype=np.float32)
+                )), 0) if 'baro_altitude' in schiphol_flights.columns else None,
+                "flights_over_noord": len(noord_flights) if noord_flights is not None else int(noord_count)
             }
             
             analysis_results["schiphol_operations_analysis"] = schiphol_analysis
@@ -194,13 +232,10 @@ class EnhancedAmsterdamAnalysis:
         if not local_flights.empty and not schiphol_flights.empty:
             comparative = {
                 "local_vs_total_percentage": round((len(local_flights) / len(schiphol_flights)) * 100, 1),
-                "high_impact_local_flights": len(local_flights[local_flights.get('estimated_noise_db', 0) >= 65]) if 'estimated_noise_db' in local_flights.columns else 0,
-                "schiphol_traffic_overhead": len(schiphol_flights[
-                    (schiphol_flights['latitude'] >= self.target_coords[0] - 0.01) &
-                    (schiphol_flights['latitude'] <= self.target_coords[0] + 0.01) &
-                    (schiphol_flights['longitude'] >= self.target_coords[1] - 0.01) &
-                    (schiphol_flights['longitude'] <= self.target_coords[1] + 0.01)
-                ])
+                "high_impact_local_flights": int(np.count_nonzero(
+                    local_flights['estimated_noise_db'].to_numpy() >= 65
+                )) if 'estimated_noise_db' in local_flights.columns else 0,
+                "schiphol_traffic_overhead": int(overhead_count)
             }
             
             analysis_results["comparative_analysis"] = comparative
@@ -209,7 +244,9 @@ class EnhancedAmsterdamAnalysis:
     
     def generate_enhanced_report(self, analysis: dict) -> str:
         """Generate comprehensive text report"""
-        report = f"""
+        buf = io.StringIO()
+        w = buf.write
+        w(f"""
 ═══════════════════════════════════════════════════════════════
     ENHANCED AMSTERDAM NOORD {self.postcode} FLIGHT ANALYSIS    
 ═══════════════════════════════════════════════════════════════
@@ -218,88 +255,88 @@ Target: Postal Code {self.postcode} ({self.target_coords[0]:.4f}, {self.target_c
 
 🏠 LOCAL RESIDENTIAL IMPACT ANALYSIS
 ──────────────────────────────────────────────────────────────
-"""
+""")
         
         local_analysis = analysis.get("local_area_analysis", {})
         if "error" not in local_analysis:
-            report += f"""
+            w(f"""
 Total flights detected over {self.postcode}: {local_analysis.get('total_flights', 0)}
 
 NOISE IMPACT:
-"""
+""")
             noise_analysis = local_analysis.get("noise_analysis", {})
             if noise_analysis:
                 for impact, count in noise_analysis.get("impact_distribution", {}).items():
-                    report += f"  • {impact}: {count} flights\n"
+                    w(f"  • {impact}: {count} flights\n")
                 
-                report += f"""
+                w(f"""
   • Average noise level: {noise_analysis.get('average_noise_level', 'N/A')} dB
   • High impact flights (≥65dB): {noise_analysis.get('high_impact_flights', 0)}
   • Loudest aircraft: {', '.join(noise_analysis.get('high_noise_aircraft', [])[:3])}
 
-"""
+""")
             
             # Schiphol operations for local area
             schiphol_ops = local_analysis.get("schiphol_operations", {})
             if schiphol_ops:
-                report += f"""SCHIPHOL OPERATIONS AFFECTING YOUR AREA:
+                w(f"""SCHIPHOL OPERATIONS AFFECTING YOUR AREA:
   • Direct overhead (within 2km): {schiphol_ops.get('direct_overhead', 0)} flights
   • Likely Schiphol traffic: {schiphol_ops.get('likely_schiphol_traffic', 0)} flights
   
   Operation types:
-"""
+""")
                 for op_type, count in schiphol_ops.get("operation_types", {}).items():
-                    report += f"    - {op_type}: {count}\n"
+                    w(f"    - {op_type}: {count}\n")
                 
-                report += "\n  Approach corridors:\n"
+                w("\n  Approach corridors:\n")
                 for corridor, count in schiphol_ops.get("approach_corridors", {}).items():
-                    report += f"    - {corridor}: {count}\n"
+                    w(f"    - {corridor}: {count}\n")
         else:
-            report += "  No flights detected in local area\n"
+            w("  No flights detected in local area\n")
         
-        report += f"""
+        w(f"""
 
 ✈️  BROADER SCHIPHOL TRAFFIC ANALYSIS
 ──────────────────────────────────────────────────────────────
-"""
+""")
         
         schiphol_analysis = analysis.get("schiphol_operations_analysis", {})
         if "error" not in schiphol_analysis:
-            report += f"""
+            w(f"""
 Total flights in Schiphol area: {schiphol_analysis.get('total_area_flights', 0)}
 Confirmed Schiphol operations: {schiphol_analysis.get('schiphol_operations', 0)}
 Flights over Amsterdam Noord region: {schiphol_analysis.get('flights_over_noord', 0)}
 Average flight altitude: {schiphol_analysis.get('average_altitude', 'N/A')} feet
 
 OPERATION BREAKDOWN:
-"""
+""")
             for operation, count in schiphol_analysis.get("operation_breakdown", {}).items():
                 percentage = (count / schiphol_analysis.get('total_area_flights', 1)) * 100
-                report += f"  • {operation}: {count} ({percentage:.1f}%)\n"
+                w(f"  • {operation}: {count} ({percentage:.1f}%)\n")
             
-            report += "\nAPPROACH CORRIDORS:\n"
+            w("\nAPPROACH CORRIDORS:\n")
             for corridor, count in schiphol_analysis.get("approach_corridors", {}).items():
-                report += f"  • {corridor}: {count} flights\n"
+                w(f"  • {corridor}: {count} flights\n")
         else:
-            report += "  No Schiphol area flights detected\n"
+            w("  No Schiphol area flights detected\n")
         
         # Comparative analysis
         comparative = analysis.get("comparative_analysis", {})
         if comparative:
-            report += f"""
+            w(f"""
 
 📊 COMPARATIVE INSIGHTS
 ──────────────────────────────────────────────────────────────
 • Your area represents {comparative.get('local_vs_total_percentage', 0)}% of detected Schiphol area traffic
 • High-impact flights directly over {self.postcode}: {comparative.get('high_impact_local_flights', 0)}
 • Schiphol traffic passing directly overhead: {comparative.get('schiphol_traffic_overhead', 0)}
-"""
+""")
         
-        report += f"""
+        w(f"""
 
 💡 KEY TAKEAWAYS
 ──────────────────────────────────────────────────────────────
-"""
+""")
         
         # Generate insights based on data
         if local_analysis and "error" not in local_analysis:
@@ -307,26 +344,26 @@ OPERATION BREAKDOWN:
             high_impact = noise_data.get("high_impact_flights", 0)
             
             if high_impact > 0:
-                report += f"⚠️  {high_impact} flights caused high noise impact (≥65dB) over your area\n"
+                w(f"⚠️  {high_impact} flights caused high noise impact (≥65dB) over your area\n")
             
             total_local = local_analysis.get("total_flights", 0)
             if total_local > 0:
-                report += f"📍 {total_local} flights detected directly over postal code {self.postcode}\n"
+                w(f"📍 {total_local} flights detected directly over postal code {self.postcode}\n")
         
         if schiphol_analysis and "error" not in schiphol_analysis:
             noord_flights = schiphol_analysis.get("flights_over_noord", 0)
             if noord_flights > 0:
-                report += f"🛫 {noord_flights} Schiphol-related flights passed over Amsterdam Noord region\n"
+                w(f"🛫 {noord_flights} Schiphol-related flights passed over Amsterdam Noord region\n")
         
-        report += f"""
+        w(f"""
 🔄 This analysis combines hyperlocal monitoring of your {self.postcode} area with 
    broader Schiphol traffic patterns to give you complete situational awareness.
 
 💡 For historical trends, run: --mode historical --hours 1
 💡 For cached analysis, run: --mode cached
-"""
+""")
         
-        return report
+        return buf.getvalue()
 
 
 def main():
@@ -344,6 +381,8 @@ def main():
                        help='Skip caching of results')
     parser.add_argument('--cleanup', action='store_true',
                        help='Clean up old cache files')
+    parser.add_argument('--database', action='store_true',
+                       help='In cached mode, query Noord flights from the PostgreSQL analysis database')
     
     args = parser.parse_args()
     
@@ -379,12 +418,24 @@ def main():
     # Get flight data based on mode
     local_flights = pd.DataFrame()
     schiphol_flights = pd.DataFrame()
+    noord_flights = None
     
     if args.mode == 'cached':
         print("📁 Loading cached data...")
         local_flights = analyzer.cache.load_opensky_data(hours_back=24)
         schiphol_flights = local_flights  # Use same data for cached mode
         
+        if args.database:
+            # Let PostgreSQL filter the Noord box via its partial index
+            from etl_pipeline import AviationETLPipeline
+            pipeline = AviationETLPipeline()
+            noord_flights = pipeline.load_noord_flights(hours_back=24)
+            pipeline.close()
+            if noord_flights is None:
+                print("⚠️  Database query failed - counting Noord flights from the cache instead")
+            else:
+                print(f"🗄️  Noord flight count from PostgreSQL (last 24h): {len(noord_flights)}")
+        
     else:
         # Load credentials and fetch live data
         creds = load_credentials(args.credentials)
@@ -410,7 +461,7 @@ def main():
         return
     
     print("🧠 Performing enhanced analysis...")
-    analysis_results = analyzer.analyze_comprehensive(local_flights, schiphol_flights)
+    analysis_results = analyzer.analyze_comprehensive(local_flights, schiphol_flights, noord_flights)
     
     # Generate and display report
     report = analyzer.generate_enhanced_report(analysis_results)
@@ -418,8 +469,16 @@ def main():
     
     # Save detailed results
     results_file = f"enhanced_analysis_{args.postcode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(results_file, 'w') as f:
-        json.dump(analysis_results, f, indent=2, default=str)
+    if orjson is not None:
+        # Native datetime/numpy support; anything else still falls back to str
+        with open(results_file, 'wb') as f:
+            f.write(orjson.dumps(
+                analysis_results, default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ))
+    else:
+        with open(results_file, 'w') as f:
+            json.dump(analysis_results, f, indent=2, default=str)
     
     print(f"📄 Detailed results saved to: {results_file}")
 
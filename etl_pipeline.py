@@ -7,15 +7,93 @@ Author: Giovanni Antoniazzi (Studio Bereikbaar)
 Purpose: Robust data pipeline for 2-week collection and future analysis
 """
 
+import csv
+import io
+import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
 import psycopg2.extras
+import pandas as pd
 from datetime import datetime, timedelta
 import logging
 import sys
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import json
 
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # inotify_simple is optional (Linux only) - fall back to mtime polling
+    INotify = None
+
+# Target columns of flight_data.flights, in insert order
+FLIGHT_COLUMNS = [
+    'collection_time', 'icao24', 'callsign', 'origin_country',
+    'latitude', 'longitude', 'baro_altitude', 'velocity', 'true_track', 'vertical_rate',
+    'area_type', 'distance_to_house_km', 'estimated_noise_db', 'noise_impact_level',
+    'schiphol_operation', 'approach_corridor', 'aircraft_category',
+    'hour_of_day', 'day_of_week', 'is_weekend', 'time_period',
+    'is_over_house', 'is_low_altitude', 'is_high_noise'
+]
+
+# Pattern flags that default to FALSE when the collector left them empty
+FLAG_COLUMNS = ['is_over_house', 'is_low_altitude', 'is_high_noise']
+
+# NULL marker for COPY; csv.writer writes None and '' alike (an empty
+# field), so None is written as this marker and '' stays an empty string
+COPY_NULL = r'\N'
+COPY_FLIGHTS_QUERY = f"COPY flight_data.flights ({', '.join(FLIGHT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+INSERT_FLIGHTS_QUERY = f"INSERT INTO flight_data.flights ({', '.join(FLIGHT_COLUMNS)}) VALUES %s"
+INSERT_FLIGHTS_TEMPLATE = f"({', '.join(f'%({column})s' for column in FLIGHT_COLUMNS)})"
+
+# ETL watermark row tracking the last SQLite flight id loaded
+WATERMARK_NAME = 'sqlite_flights'
+UPSERT_WATERMARK_QUERY = """
+INSERT INTO flight_data.etl_watermark (name, last_id) VALUES (%s, %s)
+ON CONFLICT (name) DO UPDATE SET last_id = EXCLUDED.last_id, updated_at = NOW()
+"""
+
+# Flights over the Amsterdam Noord box; the predicate matches the
+# idx_flights_noord partial index, so keep the literals in sync
+NOORD_FLIGHTS_QUERY = """
+SELECT * FROM flight_data.flights
+WHERE latitude BETWEEN 52.37 AND 52.43 AND longitude BETWEEN 4.85 AND 4.95
+  AND collection_time >= NOW() - %s * INTERVAL '1 hour'
+ORDER BY collection_time
+"""
+
+# Flights per multi-row INSERT statement
+LOAD_PAGE_SIZE = 1000
+
+# Chunks buffered between pipeline stages (extract -> transform -> load)
+PIPELINE_QUEUE_SIZE = 4
+
+# Connection settings for the long-lived SQLite reader; the extract scans
+# flights by its INTEGER PRIMARY KEY (the rowid), so no extra index is needed
+SQLITE_READ_PRAGMAS = [
+    "PRAGMA cache_size=-262144",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+]
+
+# SQLite rows extracted (and transformed/loaded) per chunk
+EXTRACT_CHUNK_SIZE = 10000
+
+# Continuous mode: longest wait between cycles, mtime poll interval without
+# inotify, and error backoff bounds (seconds)
+CYCLE_INTERVAL = 300
+POLL_INTERVAL = 5
+ERROR_BACKOFF_MIN = 60
+ERROR_BACKOFF_MAX = 600
+
+# Refresh monitoring.update_daily_stats() once this many flights have been
+# loaded since the last refresh, or when the last refresh is this old
+STATS_MIN_FLIGHTS = 1000
+STATS_MAX_AGE = timedelta(minutes=15)
+
 class AviationETLPipeline:
     """ETL Pipeline for transferring flight data to analysis database"""
     
@@ -35,6 +113,15 @@ class AviationETLPipeline:
         }
         
         self.logger = self._setup_logging()
+        self._inotify = None
+        
+        # Long-lived connections, opened on first use and reused every cycle
+        self.sqlite_conn = None
+        self.pg_conn = None
+        
+        # Monitoring stats refresh bookkeeping (see update_monitoring_stats)
+        self._last_stats_update = None
+        self._flights_since_stats = 0
         
     def _setup_logging(self) -> logging.Logger:
         """Configure logging for ETL operations"""
@@ -48,10 +135,56 @@ class AviationETLPipeline:
         
         return logger
     
-    def extract_new_flights(self, last_processed_id: int = 0) -> List[Dict]:
-        """Extract new flight records from SQLite"""
-        conn = sqlite3.connect(self.sqlite_path)
-        conn.row_factory = sqlite3.Row
+    def _ensure_sqlite(self) -> sqlite3.Connection:
+        """Return the SQLite connection, opening it on first use"""
+        if self.sqlite_conn is None:
+            # Used by the extract thread of each cycle, one thread at a time
+            self.sqlite_conn = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self.sqlite_conn.row_factory = sqlite3.Row
+            
+            # Reader tuning: 256MB page cache, memory-mapped reads, in-memory
+            # temp storage (WAL itself is enabled by the collector)
+            for pragma in SQLITE_READ_PRAGMAS:
+                self.sqlite_conn.execute(pragma)
+        return self.sqlite_conn
+    
+    def _ensure_pg(self):
+        """Return the PostgreSQL connection, (re)connecting if it is missing or closed"""
+        if self.pg_conn is None or self.pg_conn.closed:
+            self.pg_conn = psycopg2.connect(**self.pg_params)
+        return self.pg_conn
+    
+    def _reset_pg(self):
+        """Roll back a failed transaction; drop the connection if the server went away"""
+        if self.pg_conn is None or self.pg_conn.closed:
+            return
+        try:
+            self.pg_conn.rollback()
+        except psycopg2.Error:
+            self.pg_conn.close()
+    
+    def close(self):
+        """Close the long-lived database connections"""
+        if self.sqlite_conn is not None:
+            self.sqlite_conn.close()
+            self.sqlite_conn = None
+        if self.pg_conn is not None:
+            self.pg_conn.close()
+            self.pg_conn = None
+    
+    def iter_new_flights(self, last_processed_id: int = 0,
+                         chunk_size: int = EXTRACT_CHUNK_SIZE) -> Iterator[List[Dict]]:
+        """
+        Extract new flight records from SQLite in chunks
+        
+        Args:
+            last_processed_id: Only rows with a higher SQLite id are extracted
+            chunk_size: Rows fetched per chunk
+            
+        Yields:
+            Lists of at most chunk_size flight dicts, in id order
+        """
+        conn = self._ensure_sqlite()
         
         query = """
         SELECT * FROM flights 
@@ -59,131 +192,324 @@ class AviationETLPipeline:
         ORDER BY id
         """
         
+        extracted = 0
         cursor = conn.execute(query, (last_processed_id,))
-        flights = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                extracted += len(rows)
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
         
-        self.logger.info(f"Extracted {len(flights)} new flights from SQLite")
-        return flights
+        self.logger.info(f"Extracted {extracted} new flights from SQLite")
     
     def transform_flight_data(self, flights: List[Dict]) -> List[Dict]:
         """Transform flight data for PostgreSQL schema"""
-        transformed = []
+        if not flights:
+            return []
         
-        for flight in flights:
-            # Convert timestamp format
-            collection_time = datetime.fromisoformat(flight['collection_time'].replace('Z', '+00:00'))
-            
-            transformed_flight = {
-                'collection_time': collection_time,
-                'icao24': flight['icao24'],
-                'callsign': flight.get('callsign'),
-                'origin_country': flight.get('origin_country'),
-                'latitude': flight.get('latitude'),
-                'longitude': flight.get('longitude'),
-                'baro_altitude': flight.get('baro_altitude'),
-                'velocity': flight.get('velocity'),
-                'true_track': flight.get('true_track'),
-                'vertical_rate': flight.get('vertical_rate'),
-                'area_type': flight['area_type'],
-                'distance_to_house_km': flight.get('distance_to_house_km'),
-                'estimated_noise_db': flight.get('estimated_noise_db'),
-                'noise_impact_level': flight.get('noise_impact_level'),
-                'schiphol_operation': flight.get('schiphol_operation'),
-                'approach_corridor': flight.get('approach_corridor'),
-                'aircraft_category': flight.get('aircraft_category'),
-                'hour_of_day': flight.get('hour_of_day'),
-                'day_of_week': flight.get('day_of_week'),
-                'is_weekend': flight.get('is_weekend'),
-                'time_period': flight.get('time_period'),
-                'is_over_house': flight.get('is_over_house', False),
-                'is_low_altitude': flight.get('is_low_altitude', False),
-                'is_high_noise': flight.get('is_high_noise', False)
-            }
-            
-            transformed.append(transformed_flight)
+        # Column-wise transform; object dtype keeps the SQLite values as-is
+        df = pd.DataFrame(flights, dtype=object).reindex(columns=FLIGHT_COLUMNS)
+        
+        # Convert timestamp format in one vectorized parse
+        timestamps = df['collection_time'].str.replace('Z', '+00:00', regex=False)
+        try:
+            df['collection_time'] = pd.to_datetime(timestamps, format='ISO8601').astype(object)
+        except ValueError:  # mixed UTC offsets - parse row by row
+            df['collection_time'] = [datetime.fromisoformat(ts) for ts in timestamps]
+        
+        df[FLAG_COLUMNS] = df[FLAG_COLUMNS].where(df[FLAG_COLUMNS].notna(), False)
         
-        return transformed
+        # Missing values become SQL NULLs
+        return df.astype(object).where(df.notna(), None).to_dict('records')
     
-    def load_flights_to_postgresql(self, flights: List[Dict]) -> int:
-        """Load transformed flight data into PostgreSQL"""
+    def load_flights_to_postgresql(self, flights: List[Dict], last_source_id: Optional[int] = None) -> int:
+        """
+        Load transformed flight data into PostgreSQL
+        
+        Args:
+            flights: Transformed flight records
+            last_source_id: Highest SQLite id in this batch; recorded as the
+                            ETL watermark in the same transaction as the rows
+        
+        Returns:
+            Number of flights loaded
+        """
         if not flights:
             return 0
             
-        conn = psycopg2.connect(**self.pg_params)
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        insert_query = """
-        INSERT INTO flight_data.flights (
-            collection_time, icao24, callsign, origin_country,
-            latitude, longitude, baro_altitude, velocity, true_track, vertical_rate,
-            area_type, distance_to_house_km, estimated_noise_db, noise_impact_level,
-            schiphol_operation, approach_corridor, aircraft_category,
-            hour_of_day, day_of_week, is_weekend, time_period,
-            is_over_house, is_low_altitude, is_high_noise
-        ) VALUES (
-            %(collection_time)s, %(icao24)s, %(callsign)s, %(origin_country)s,
-            %(latitude)s, %(longitude)s, %(baro_altitude)s, %(velocity)s, 
-            %(true_track)s, %(vertical_rate)s, %(area_type)s, 
-            %(distance_to_house_km)s, %(estimated_noise_db)s, %(noise_impact_level)s,
-            %(schiphol_operation)s, %(approach_corridor)s, %(aircraft_category)s,
-            %(hour_of_day)s, %(day_of_week)s, %(is_weekend)s, %(time_period)s,
-            %(is_over_house)s, %(is_low_altitude)s, %(is_high_noise)s
-        ) RETURNING id
-        """
+        conn = self._ensure_pg()
+        cursor = conn.cursor()
         
-        loaded_count = 0
-        for flight in flights:
-            try:
-                cursor.execute(insert_query, flight)
-                loaded_count += 1
-            except Exception as e:
-                self.logger.error(f"Failed to load flight {flight.get('icao24')}: {e}")
-                conn.rollback()
-                continue
+        # Bulk COPY first; if any row is rejected, fall back to paged
+        # INSERTs which isolate the bad rows
+        loaded_count = self._copy_flights(cursor, flights)
+        if loaded_count is None:
+            loaded_count = 0
+            for start in range(0, len(flights), LOAD_PAGE_SIZE):
+                loaded_count += self._insert_flight_page(cursor, flights[start:start + LOAD_PAGE_SIZE])
+        
+        if last_source_id is not None:
+            cursor.execute(UPSERT_WATERMARK_QUERY, (WATERMARK_NAME, last_source_id))
         
         conn.commit()
         cursor.close()
-        conn.close()
         
         self.logger.info(f"Loaded {loaded_count} flights into PostgreSQL")
         return loaded_count
     
+    def _copy_flights(self, cursor, flights: List[Dict]) -> Optional[int]:
+        """
+        Bulk load flights with COPY ... FROM STDIN under a savepoint
+        
+        Returns:
+            Number of flights copied, or None if COPY failed and was rolled back
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for flight in flights:
+            # None -> unquoted NULL marker; '' -> empty string, as with INSERT
+            writer.writerow([COPY_NULL if (value := flight.get(column)) is None else value
+                             for column in FLIGHT_COLUMNS])
+        buf.seek(0)
+        
+        cursor.execute("SAVEPOINT flight_copy")
+        try:
+            cursor.copy_expert(COPY_FLIGHTS_QUERY, buf)
+            cursor.execute("RELEASE SAVEPOINT flight_copy")
+            return len(flights)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT flight_copy")
+            cursor.execute("RELEASE SAVEPOINT flight_copy")
+            self.logger.warning(f"COPY of {len(flights)} flights failed, retrying with INSERTs: {e}")
+            return None
+    
+    def _insert_flight_page(self, cursor, page: List[Dict]) -> int:
+        """
+        Insert a page of flights under a savepoint
+        
+        A failing page is rolled back to its savepoint and bisected, so one
+        bad row only costs itself instead of the whole batch.
+        
+        Returns:
+            Number of flights inserted
+        """
+        cursor.execute("SAVEPOINT flight_page")
+        try:
+            psycopg2.extras.execute_values(
+                cursor, INSERT_FLIGHTS_QUERY, page,
+                template=INSERT_FLIGHTS_TEMPLATE, page_size=len(page)
+            )
+            cursor.execute("RELEASE SAVEPOINT flight_page")
+            return len(page)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT flight_page")
+            cursor.execute("RELEASE SAVEPOINT flight_page")
+            
+            if len(page) == 1:
+                self.logger.error(f"Failed to load flight {page[0].get('icao24')}: {e}")
+                return 0
+            
+            mid = len(page) // 2
+            return self._insert_flight_page(cursor, page[:mid]) + self._insert_flight_page(cursor, page[mid:])
+    
     def get_last_processed_id(self) -> int:
-        """Get the last processed flight ID from PostgreSQL"""
+        """Get the last processed SQLite flight ID from the ETL watermark"""
         try:
-            conn = psycopg2.connect(**self.pg_params)
+            conn = self._ensure_pg()
             cursor = conn.cursor()
             
-            cursor.execute("SELECT MAX(id) FROM flight_data.flights")
+            cursor.execute("SELECT last_id FROM flight_data.etl_watermark WHERE name = %s", (WATERMARK_NAME,))
             result = cursor.fetchone()
             
+            if result is None:
+                # No watermark yet (database predates it) - fall back to the table
+                cursor.execute("SELECT MAX(id) FROM flight_data.flights")
+                result = cursor.fetchone()
+            
             cursor.close()
-            conn.close()
+            conn.commit()  # End the read transaction
             
             return result[0] if result[0] is not None else 0
             
         except Exception as e:
+            self._reset_pg()
             self.logger.warning(f"Could not get last processed ID: {e}")
             return 0
     
-    def update_monitoring_stats(self):
-        """Update daily monitoring statistics"""
+    def load_noord_flights(self, hours_back: int = 24) -> Optional[pd.DataFrame]:
+        """
+        Load recent flights over Amsterdam Noord, filtered server-side
+        
+        Args:
+            hours_back: Number of hours to look back
+            
+        Returns:
+            DataFrame of matching flights, or None if the query failed
+        """
         try:
-            conn = psycopg2.connect(**self.pg_params)
+            conn = self._ensure_pg()
+            cursor = conn.cursor()
+            
+            cursor.execute(NOORD_FLIGHTS_QUERY, (hours_back,))
+            columns = [column[0] for column in cursor.description]
+            noord_flights = pd.DataFrame(cursor.fetchall(), columns=columns)
+            
+            cursor.close()
+            conn.commit()  # End the read transaction
+            
+            self.logger.info(f"Loaded {len(noord_flights)} Noord flights from the last {hours_back}h")
+            return noord_flights
+            
+        except Exception as e:
+            self._reset_pg()
+            self.logger.error(f"Failed to load Noord flights: {e}")
+            return None
+    
+    def update_monitoring_stats(self, force: bool = False):
+        """
+        Update daily monitoring statistics
+        
+        The aggregation is skipped unless STATS_MIN_FLIGHTS flights were
+        loaded since the last refresh or it is older than STATS_MAX_AGE.
+        
+        Args:
+            force: Refresh regardless of the thresholds
+        """
+        now = datetime.now()
+        if not force and self._last_stats_update is not None \
+                and self._flights_since_stats < STATS_MIN_FLIGHTS \
+                and now - self._last_stats_update < STATS_MAX_AGE:
+            return
+        
+        try:
+            conn = self._ensure_pg()
             cursor = conn.cursor()
             
             cursor.execute("SELECT monitoring.update_daily_stats()")
             conn.commit()
             
             cursor.close()
-            conn.close()
             
+            self._last_stats_update = now
+            self._flights_since_stats = 0
             self.logger.info("Updated monitoring statistics")
             
         except Exception as e:
+            self._reset_pg()
             self.logger.error(f"Failed to update monitoring stats: {e}")
     
+    def wait_for_new_data(self, timeout: float = CYCLE_INTERVAL) -> bool:
+        """
+        Block until the collector writes to the SQLite database (or its WAL)
+        
+        Uses inotify when available, otherwise polls the files' mtimes.
+        
+        Args:
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            True if a write was seen, False if the timeout elapsed
+        """
+        db_dir, db_name = os.path.split(os.path.abspath(self.sqlite_path))
+        deadline = time.monotonic() + timeout
+        
+        if INotify is not None:
+            if self._inotify is None:
+                self._inotify = INotify()
+                self._inotify.add_watch(db_dir, inotify_flags.MODIFY | inotify_flags.CLOSE_WRITE)
+            
+            while (remaining := deadline - time.monotonic()) > 0:
+                events = self._inotify.read(timeout=int(remaining * 1000))
+                # Matches the database itself and its -wal/-journal files
+                if any(event.name.startswith(db_name) for event in events):
+                    return True
+            return False
+        
+        def mtimes():
+            stamps = []
+            for suffix in ('', '-wal'):
+                try:
+                    stamps.append(os.stat(self.sqlite_path + suffix).st_mtime_ns)
+                except FileNotFoundError:
+                    stamps.append(None)
+            return stamps
+        
+        baseline = mtimes()
+        while (remaining := deadline - time.monotonic()) > 0:
+            time.sleep(min(POLL_INTERVAL, remaining))
+            if mtimes() != baseline:
+                return True
+        return False
+    
+    def _pipelined_chunks(self, last_processed_id: int) -> Iterator[tuple]:
+        """
+        Run extract and transform in background threads, connected by bounded queues
+        
+        Errors in a stage are re-raised here once the stream ends; if the
+        consumer stops early, the stages are told to stop as well.
+        
+        Yields:
+            Tuples of (last SQLite id, chunk size, transformed flights) in id order
+        """
+        raw_chunks = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        ready_chunks = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        done = object()
+        stop = threading.Event()
+        
+        def put(q, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def get(q):
+            # Returns done once stopped, so a stage never blocks on a queue
+            # whose producer has already given up
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            return done
+        
+        def extract():
+            try:
+                for flights in self.iter_new_flights(last_processed_id):
+                    if not put(raw_chunks, flights):
+                        return
+            finally:
+                put(raw_chunks, done)
+        
+        def transform():
+            try:
+                while (flights := get(raw_chunks)) is not done:
+                    item = (flights[-1]['id'], len(flights), self.transform_flight_data(flights))
+                    if not put(ready_chunks, item):
+                        return
+            except BaseException:
+                put(ready_chunks, done)
+                stop.set()  # Unblock the extractor
+                raise
+            put(ready_chunks, done)
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            stages = [executor.submit(extract), executor.submit(transform)]
+            try:
+                while (item := ready_chunks.get()) is not done:
+                    yield item
+            finally:
+                stop.set()
+        
+        for stage in stages:
+            stage.result()  # Propagate extract/transform errors
+    
     def run_etl_cycle(self) -> Dict:
         """Execute complete ETL cycle"""
         start_time = datetime.now()
@@ -192,20 +518,21 @@ class AviationETLPipeline:
             # Get last processed ID to avoid duplicates
             last_id = self.get_last_processed_id()
             
-            # Extract new flights
-            flights = self.extract_new_flights(last_id)
+            # Extract, transform and load chunk by chunk so memory stays
+            # bounded by the chunk size rather than the backlog; extract and
+            # transform run ahead in threads while chunks are loaded
+            extracted_count = 0
+            loaded_count = 0
+            for last_source_id, chunk_size, transformed in self._pipelined_chunks(last_id):
+                extracted_count += chunk_size
+                loaded_count += self.load_flights_to_postgresql(transformed, last_source_id=last_source_id)
             
-            if not flights:
+            if not extracted_count:
                 self.logger.info("No new flights to process")
                 return {'status': 'success', 'flights_processed': 0}
             
-            # Transform data
-            transformed_flights = self.transform_flight_data(flights)
-            
-            # Load into PostgreSQL
-            loaded_count = self.load_flights_to_postgresql(transformed_flights)
-            
-            # Update monitoring
+            # Update monitoring (throttled - see update_monitoring_stats)
+            self._flights_since_stats += loaded_count
             self.update_monitoring_stats()
             
             duration = (datetime.now() - start_time).total_seconds()
@@ -221,6 +548,7 @@ class AviationETLPipeline:
             return result
             
         except Exception as e:
+            self._reset_pg()
             self.logger.error(f"ETL cycle failed: {e}")
             return {
                 'status': 'error',
@@ -234,22 +562,25 @@ def main():
     
     if len(sys.argv) > 1 and sys.argv[1] == '--continuous':
         # Continuous mode for production
-        import time
-        
         print("Starting continuous ETL pipeline...")
+        error_delay = ERROR_BACKOFF_MIN
         while True:
             result = pipeline.run_etl_cycle()
             
             if result['status'] == 'error':
-                print(f"ETL Error: {result['error']}")
-                time.sleep(60)  # Wait 1 minute on error
+                print(f"ETL Error: {result['error']} (retrying in {error_delay}s)")
+                time.sleep(error_delay)
+                error_delay = min(error_delay * 2, ERROR_BACKOFF_MAX)  # Back off on repeated errors
             else:
                 print(f"Processed {result['flights_processed']} flights")
-                time.sleep(300)  # Run every 5 minutes
+                error_delay = ERROR_BACKOFF_MIN
+                # Wake as soon as the collector writes, at least every 5 minutes
+                pipeline.wait_for_new_data(CYCLE_INTERVAL)
                 
     else:
         # Single run mode
         result = pipeline.run_etl_cycle()
+        pipeline.close()
         print(json.dumps(result, indent=2))
 
 if __name__ == "__main__":
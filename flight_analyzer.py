@@ -1,16 +1,120 @@
 """
 Flight data analysis and EDA for Amsterdam Noord
 """
+import os
+import sys
 import pandas as pd
 import numpy as np
+import matplotlib
+if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+    matplotlib.use('Agg')  # Headless (server/cron/worker process) - render to files only
 import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
 import seaborn as sns
 from datetime import datetime, timedelta
 import folium
 from folium import plugins
-import os
+import copy
+import io
 from pathlib import Path
 
+from frame_memo import FrameMemo
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional - fall back to numpy reductions
+    njit = None
+
+# Flights below this altitude (feet) count as low-altitude for noise analysis
+LOW_ALTITUDE_FT = 3000
+
+
+# Leaflet callback for FastMarkerCluster rows of [lat, lon, color, popup]
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: row[2], fillColor: row[2], fillOpacity: 0.7
+    });
+    marker.bindPopup(row[3]);
+    return marker;
+};
+"""
+
+
+def _altitude_stats_numpy(alt, low_threshold):
+    valid = alt[~np.isnan(alt)]
+    if not valid.size:
+        return 0, np.nan, np.nan, np.nan, np.nan, 0
+    std = valid.std(ddof=1) if valid.size > 1 else np.nan
+    return (valid.size, valid.mean(), std, valid.min(), valid.max(),
+            int(np.count_nonzero(valid < low_threshold)))
+
+
+if njit is not None:
+    # fastmath without 'nnan': missing altitudes are NaN and must be skipped
+    @njit(parallel=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'}, cache=True)
+    def _altitude_stats_numba(alt, low_threshold):
+        # Shift by the first valid value so the sum of squares doesn't cancel
+        shift = 0.0
+        for i in range(alt.shape[0]):
+            if not np.isnan(alt[i]):
+                shift = alt[i]
+                break
+        
+        n = 0
+        total = 0.0
+        total_sq = 0.0
+        lowest = np.inf
+        highest = -np.inf
+        low = 0
+        for i in prange(alt.shape[0]):
+            x = alt[i]
+            if not np.isnan(x):
+                d = x - shift
+                n += 1
+                total += d
+                total_sq += d * d
+                lowest = min(lowest, x)
+                highest = max(highest, x)
+                if x < low_threshold:
+                    low += 1
+        
+        if n == 0:
+            return 0, np.nan, np.nan, np.nan, np.nan, 0
+        std = np.sqrt(max(total_sq - total * total / n, 0.0) / (n - 1)) if n > 1 else np.nan
+        return n, shift + total / n, std, lowest, highest, low
+
+
+def altitude_stats(alt: np.ndarray, low_threshold: float = LOW_ALTITUDE_FT):
+    """
+    Count, mean, std (ddof=1), min, max and low-altitude count in one pass
+    
+    Args:
+        alt: Altitude per flight in feet (NaN where unknown)
+        low_threshold: Altitude below which a flight counts as low
+        
+    Returns:
+        Tuple of (count, mean, std, min, max, low_count) over the known altitudes
+    """
+    alt = np.ascontiguousarray(alt, dtype=np.float64)
+    if njit is not None:
+        return _altitude_stats_numba(alt, float(low_threshold))
+    return _altitude_stats_numpy(alt, float(low_threshold))
+
+
+def value_count_dict(values: pd.Series) -> dict:
+    """
+    value_counts().to_dict() via factorize + bincount
+    
+    Hashes the column once into integer codes and counts them with a single
+    C loop. Missing values are ignored; most frequent first, ties in order
+    of first appearance.
+    """
+    codes, uniques = pd.factorize(values)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    order = np.argsort(-counts, kind='stable')
+    return dict(zip(np.asarray(uniques)[order].tolist(), counts[order].tolist()))
+
 
 class FlightAnalyzer:
     """Exploratory Data Analysis for flight patterns over Amsterdam Noord"""
@@ -29,10 +133,41 @@ class FlightAnalyzer:
         self.center_lat = 52.40
         self.center_lon = 4.90
         
+        # (frame, parsed data_time) of the last frame whose timestamps were strings
+        self._parsed_times = None
+        
+        # Last analyze_flight_patterns input/result, so generating a report
+        # for an already analysed DataFrame skips the analysis
+        self._analysis_memo = FrameMemo()
+    
+    def _ensure_datetime(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Return df['data_time'] as datetime64, parsing strings at most once per frame
+        
+        Analysis and plotting of the same frame share the parsed column
+        instead of each running to_datetime over it.
+        """
+        times = df['data_time']
+        if pd.api.types.is_datetime64_any_dtype(times):
+            return times
+        if self._parsed_times is None or self._parsed_times[0] is not df:
+            self._parsed_times = (df, pd.to_datetime(times, format='ISO8601', cache=True))
+        return self._parsed_times[1]
+        
+    def _hourly_counts(self, df: pd.DataFrame) -> np.ndarray:
+        """Flights per hour of day (length 24); rows without a timestamp are skipped"""
+        # Hours are bounded integers, so a bincount is already sorted
+        hour = self._ensure_datetime(df).dropna().dt.hour.to_numpy(dtype=np.int64)
+        return np.bincount(hour, minlength=24)
+    
     def analyze_flight_patterns(self, df: pd.DataFrame) -> dict:
         """
         Perform comprehensive EDA on flight data
         
+        The result is memoized for the last DataFrame object analysed (see
+        FrameMemo): edits made to that frame in place that keep its shape are
+        not picked up, so pass a copy after modifying an analysed frame.
+        
         Args:
             df: DataFrame with flight data
             
@@ -41,48 +176,51 @@ class FlightAnalyzer:
         """
         if df.empty:
             return {"error": "No flight data to analyze"}
+        
+        # Hand out a copy of a memoized result so the stored one stays intact
+        cached = self._analysis_memo.get(df)
+        if cached is not None:
+            return copy.deepcopy(cached)
             
         analysis = {}
         
         # Basic statistics
         analysis['total_flights'] = len(df)
         analysis['unique_aircraft'] = df['icao24'].nunique()
-        analysis['countries'] = df['origin_country'].value_counts().to_dict()
-        analysis['aircraft_types'] = df['aircraft_type'].value_counts().to_dict()
+        analysis['countries'] = value_count_dict(df['origin_country'])
+        analysis['aircraft_types'] = value_count_dict(df['aircraft_type'])
         
         # Altitude analysis
         if 'baro_altitude' in df.columns:
-            alt_data = df['baro_altitude'].dropna()
-            if not alt_data.empty:
+            alt = df['baro_altitude'].to_numpy(dtype=np.float64, na_value=np.nan)
+            count, mean, std, lowest, highest, low = altitude_stats(alt, LOW_ALTITUDE_FT)
+            if count:
                 analysis['altitude_stats'] = {
-                    'mean': alt_data.mean(),
-                    'median': alt_data.median(),
-                    'min': alt_data.min(),
-                    'max': alt_data.max(),
-                    'std': alt_data.std()
+                    'mean': mean,
+                    'median': np.median(alt[~np.isnan(alt)]),
+                    'min': lowest,
+                    'max': highest,
+                    'std': std
                 }
                 
                 # Low altitude flights (potentially interesting for noise analysis)
-                low_alt_threshold = 3000  # feet
-                analysis['low_altitude_flights'] = len(alt_data[alt_data < low_alt_threshold])
-                analysis['low_altitude_percentage'] = (analysis['low_altitude_flights'] / len(alt_data)) * 100
+                analysis['low_altitude_flights'] = low
+                analysis['low_altitude_percentage'] = (low / count) * 100
         
         # Speed analysis
         if 'velocity' in df.columns:
             speed_data = df['velocity'].dropna()
             if not speed_data.empty:
-                analysis['speed_stats'] = {
-                    'mean_knots': speed_data.mean(),
-                    'median_knots': speed_data.median(),
-                    'min_knots': speed_data.min(),
-                    'max_knots': speed_data.max()
-                }
+                # One dispatched aggregation instead of four separate reductions
+                speed = speed_data.agg(['mean', 'median', 'min', 'max'])
+                analysis['speed_stats'] = {f'{stat}_knots': value for stat, value in speed.items()}
         
         # Time-based analysis
         if 'data_time' in df.columns:
-            df['hour'] = pd.to_datetime(df['data_time']).dt.hour
-            analysis['hourly_distribution'] = df['hour'].value_counts().sort_index().to_dict()
+            hourly = self._hourly_counts(df)
+            analysis['hourly_distribution'] = {h: int(hourly[h]) for h in np.flatnonzero(hourly).tolist()}
         
+        self._analysis_memo.put(df, analysis)
         return analysis
     
     def create_flight_map(self, df: pd.DataFrame, save_path: str = None) -> folium.Map:
@@ -118,27 +256,42 @@ class FlightAnalyzer:
         # Color code by aircraft type
         colors = {'Commercial': 'blue', 'Private/General Aviation': 'red', 'Other': 'green', 'Unknown': 'gray'}
         
-        # Add flight positions
-        for idx, row in df.iterrows():
-            if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-                color = colors.get(row.get('aircraft_type', 'Unknown'), 'gray')
-                
-                popup_text = f"""
-                <b>Callsign:</b> {row.get('callsign', 'Unknown')}<br>
-                <b>Country:</b> {row.get('origin_country', 'Unknown')}<br>
-                <b>Altitude:</b> {row.get('baro_altitude', 'Unknown')} ft<br>
-                <b>Speed:</b> {row.get('velocity', 'Unknown')} knots<br>
-                <b>Type:</b> {row.get('aircraft_type', 'Unknown')}
-                """
-                
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=5,
-                    popup=popup_text,
-                    color=color,
-                    fillColor=color,
-                    fillOpacity=0.7
-                ).add_to(m)
+        # Add flight positions as one JSON payload; the marker cluster builds
+        # the circle markers client-side instead of one folium object per row
+        positions = df.dropna(subset=['latitude', 'longitude'])
+        
+        def column(name):
+            if name in positions.columns:
+                return positions[name]
+            return pd.Series('Unknown', index=positions.index)
+        
+        def text(name):
+            values = column(name)
+            return values.astype(str).where(values.notna(), 'Unknown')
+        
+        # Gather colors by category code; unknown types get code -1, which
+        # picks the trailing 'gray'
+        type_codes = pd.Index(list(colors)).get_indexer(column('aircraft_type'))
+        marker_colors = np.array([*colors.values(), 'gray'])[type_codes]
+        
+        # Popup HTML for every row in one pass of vectorized string ops
+        popups = (
+            "\n                <b>Callsign:</b> " + text('callsign')
+            + "<br>\n                <b>Country:</b> " + text('origin_country')
+            + "<br>\n                <b>Altitude:</b> " + text('baro_altitude')
+            + " ft<br>\n                <b>Speed:</b> " + text('velocity')
+            + " knots<br>\n                <b>Type:</b> " + text('aircraft_type')
+            + "\n                "
+        ).tolist()
+        
+        marker_rows = [
+            [lat, lon, color, popup]
+            for lat, lon, color, popup in zip(
+                positions['latitude'].tolist(), positions['longitude'].tolist(),
+                marker_colors.tolist(), popups
+            )
+        ]
+        plugins.FastMarkerCluster(marker_rows, callback=MARKER_CALLBACK).add_to(m)
         
         # Add legend
         legend_html = '''
@@ -161,17 +314,37 @@ class FlightAnalyzer:
             
         return m
     
+    @staticmethod
+    def _finish_figure(fig, save_path: str = None, label: str = None, **savefig_kwargs):
+        """
+        Save a figure if a path is given, otherwise show it; then free it
+        
+        Closing releases the figure's pixel buffers, which pyplot would
+        otherwise keep alive for every plot made in a long-running process.
+        
+        Args:
+            fig: Figure to finish
+            save_path: Optional path to save the figure to
+            label: Name for the "saved to" message (no message if None)
+            **savefig_kwargs: Passed to Figure.savefig
+        """
+        if save_path:
+            fig.savefig(save_path, **savefig_kwargs)
+            if label:
+                print(f"{label} saved to {save_path}")
+        else:
+            plt.show()
+        plt.close(fig)
+    
     def plot_altitude_distribution(self, df: pd.DataFrame, save_path: str = None):
         """Plot altitude distribution of flights"""
-        plt.figure(figsize=(12, 6))
+        fig = plt.figure(figsize=(12, 6))
         
         if df.empty or 'baro_altitude' not in df.columns:
             plt.text(0.5, 0.5, 'No altitude data available', 
                     transform=plt.gca().transAxes, ha='center', va='center')
             plt.title('Altitude Distribution - No Data')
-            if save_path:
-                plt.savefig(save_path)
-            plt.show()
+            self._finish_figure(fig, save_path)
             return
             
         alt_data = df['baro_altitude'].dropna()
@@ -180,9 +353,7 @@ class FlightAnalyzer:
             plt.text(0.5, 0.5, 'No valid altitude data', 
                     transform=plt.gca().transAxes, ha='center', va='center')
             plt.title('Altitude Distribution - No Valid Data')
-            if save_path:
-                plt.savefig(save_path)
-            plt.show()
+            self._finish_figure(fig, save_path)
             return
         
         # Subplot 1: Histogram
@@ -206,11 +377,7 @@ class FlightAnalyzer:
         
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"Altitude plot saved to {save_path}")
-            
-        plt.show()
+        self._finish_figure(fig, save_path, "Altitude plot", dpi=300, bbox_inches='tight')
     
     def plot_time_patterns(self, df: pd.DataFrame, save_path: str = None):
         """Plot flight patterns over time"""
@@ -218,17 +385,14 @@ class FlightAnalyzer:
             print("No time data available for plotting")
             return
             
-        df_time = df.copy()
-        df_time['data_time'] = pd.to_datetime(df_time['data_time'])
-        df_time['hour'] = df_time['data_time'].dt.hour
-        df_time['minute'] = df_time['data_time'].dt.minute
+        hourly_counts = self._hourly_counts(df)
+        hours = np.flatnonzero(hourly_counts)
         
-        plt.figure(figsize=(15, 8))
+        fig = plt.figure(figsize=(15, 8))
         
         # Plot 1: Hourly distribution
         plt.subplot(2, 2, 1)
-        hourly_counts = df_time['hour'].value_counts().sort_index()
-        plt.bar(hourly_counts.index, hourly_counts.values)
+        plt.bar(hours, hourly_counts[hours])
         plt.xlabel('Hour of Day')
         plt.ylabel('Number of Aircraft')
         plt.title('Aircraft Count by Hour')
@@ -236,15 +400,15 @@ class FlightAnalyzer:
         
         # Plot 2: Aircraft type distribution
         plt.subplot(2, 2, 2)
-        if 'aircraft_type' in df_time.columns:
-            type_counts = df_time['aircraft_type'].value_counts()
+        if 'aircraft_type' in df.columns:
+            type_counts = df['aircraft_type'].value_counts()
             plt.pie(type_counts.values, labels=type_counts.index, autopct='%1.1f%%')
             plt.title('Aircraft Type Distribution')
         
         # Plot 3: Country distribution (top 10)
         plt.subplot(2, 2, 3)
-        if 'origin_country' in df_time.columns:
-            country_counts = df_time['origin_country'].value_counts().head(10)
+        if 'origin_country' in df.columns:
+            country_counts = df['origin_country'].value_counts().head(10)
             plt.barh(range(len(country_counts)), country_counts.values)
             plt.yticks(range(len(country_counts)), country_counts.index)
             plt.xlabel('Number of Aircraft')
@@ -253,26 +417,28 @@ class FlightAnalyzer:
         
         # Plot 4: Speed vs Altitude scatter
         plt.subplot(2, 2, 4)
-        if 'velocity' in df_time.columns and 'baro_altitude' in df_time.columns:
-            scatter_data = df_time[['velocity', 'baro_altitude', 'aircraft_type']].dropna()
+        if 'velocity' in df.columns and 'baro_altitude' in df.columns:
+            scatter_data = df[['velocity', 'baro_altitude', 'aircraft_type']].dropna()
             if not scatter_data.empty:
-                for aircraft_type in scatter_data['aircraft_type'].unique():
-                    type_data = scatter_data[scatter_data['aircraft_type'] == aircraft_type]
-                    plt.scatter(type_data['velocity'], type_data['baro_altitude'], 
-                              label=aircraft_type, alpha=0.6)
+                # One scatter call colored by type code, instead of one
+                # boolean-mask slice and call per aircraft type
+                codes, aircraft_types = pd.factorize(scatter_data['aircraft_type'])
+                cycle = np.array(plt.rcParams['axes.prop_cycle'].by_key()['color'])
+                type_colors = cycle[np.arange(len(aircraft_types)) % len(cycle)]
+                plt.scatter(scatter_data['velocity'], scatter_data['baro_altitude'],
+                            c=type_colors[codes], alpha=0.6)
                 plt.xlabel('Speed (knots)')
                 plt.ylabel('Altitude (feet)')
                 plt.title('Speed vs Altitude')
-                plt.legend()
+                plt.legend(handles=[
+                    Line2D([], [], marker='o', linestyle='', color=color, alpha=0.6, label=aircraft_type)
+                    for aircraft_type, color in zip(aircraft_types, type_colors)
+                ])
                 plt.grid(True, alpha=0.3)
         
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"Time patterns plot saved to {save_path}")
-            
-        plt.show()
+        self._finish_figure(fig, save_path, "Time patterns plot", dpi=300, bbox_inches='tight')
     
     def generate_report(self, df: pd.DataFrame) -> str:
         """Generate text report of analysis"""
@@ -281,7 +447,9 @@ class FlightAnalyzer:
         if 'error' in analysis:
             return f"Analysis Error: {analysis['error']}"
         
-        report = f"""
+        buf = io.StringIO()
+        w = buf.write
+        w(f"""
         AMSTERDAM NOORD FLIGHT ANALYSIS REPORT
         =====================================
         Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -291,35 +459,35 @@ class FlightAnalyzer:
         - Unique aircraft: {analysis['unique_aircraft']}
         
         AIRCRAFT TYPES:
-        """
+        """)
         
         for aircraft_type, count in analysis['aircraft_types'].items():
             percentage = (count / analysis['total_flights']) * 100
-            report += f"- {aircraft_type}: {count} ({percentage:.1f}%)\n        "
+            w(f"- {aircraft_type}: {count} ({percentage:.1f}%)\n        ")
         
         if 'altitude_stats' in analysis:
-            report += f"""
+            w(f"""
         ALTITUDE ANALYSIS:
         - Average altitude: {analysis['altitude_stats']['mean']:.0f} feet
         - Median altitude: {analysis['altitude_stats']['median']:.0f} feet
         - Altitude range: {analysis['altitude_stats']['min']:.0f} - {analysis['altitude_stats']['max']:.0f} feet
         - Low altitude flights (<3000ft): {analysis['low_altitude_flights']} ({analysis['low_altitude_percentage']:.1f}%)
-        """
+        """)
         
         if 'speed_stats' in analysis:
-            report += f"""
+            w(f"""
         SPEED ANALYSIS:
         - Average speed: {analysis['speed_stats']['mean_knots']:.0f} knots
         - Speed range: {analysis['speed_stats']['min_knots']:.0f} - {analysis['speed_stats']['max_knots']:.0f} knots
-        """
+        """)
         
-        report += f"""
+        w("""
         TOP ORIGIN COUNTRIES:
-        """
+        """)
         for country, count in list(analysis['countries'].items())[:5]:
-            report += f"- {country}: {count}\n        "
+            w(f"- {country}: {count}\n        ")
         
-        return report
+        return buf.getvalue()
 
 
 if __name__ == "__main__":
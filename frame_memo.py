@@ -0,0 +1,47 @@
+"""
+Single-entry memo for results computed from a DataFrame
+"""
+import weakref
+
+import pandas as pd
+
+
+class FrameMemo:
+    """
+    Remembers the result computed from the last DataFrame passed in
+
+    A lookup hits only for the very same DataFrame object with the same
+    shape. The frame is held through a weak reference, so the memo never
+    keeps the caller's data alive and a recycled id can't produce a false
+    hit; the result itself stays referenced until replaced or cleared.
+
+    Staleness: in-place edits that keep the shape (e.g. df.loc[...] = ...)
+    are not detected and still hit. Callers that modify a frame after it was
+    analysed must pass a copy or call clear() first.
+    """
+
+    def __init__(self):
+        self._entry = None  # (weakref to frame, shape, result)
+
+    def get(self, df: pd.DataFrame):
+        """
+        Look up the result stored for df
+
+        Returns:
+            The stored result (shared - copy it before handing it out), or
+            None on a miss
+        """
+        if self._entry is None:
+            return None
+        ref, shape, result = self._entry
+        if ref() is df and shape == df.shape:
+            return result
+        return None
+
+    def put(self, df: pd.DataFrame, result):
+        """Store result as the memo entry for df, replacing any previous one"""
+        self._entry = (weakref.ref(df), df.shape, result)
+
+    def clear(self):
+        """Forget the stored entry"""
+        self._entry = None
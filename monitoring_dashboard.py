@@ -9,6 +9,7 @@ Purpose: Maintain data quality and system health during collection
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 import sqlite3
 from datetime import datetime, timedelta
 import json
@@ -16,6 +17,17 @@ import time
 from typing import Dict, List
 import sys
 
+# Covering index for the dashboard's time-window queries: collection_time
+# range seek, and the quality columns are read from the index, not the table
+QUALITY_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_flights_quality ON flights(
+        collection_time, latitude, longitude, estimated_noise_db, is_high_noise, is_over_house
+    )
+"""
+
+# validate_data_pipeline results younger than this (seconds) are reused
+STATUS_TTL = 5
+
 class AviationMonitor:
     """Real-time monitoring for aviation data collection"""
     
@@ -33,46 +45,65 @@ class AviationMonitor:
             'password': pg_password,
             'database': pg_database
         }
+        
+        # Reused across dashboard refreshes (--watch polls every 30s)
+        self.sqlite_conn = None
+        self.pg_pool = None
+        
+        # (monotonic time, result) of the last validate_data_pipeline call
+        self._last_status = None
+    
+    def _ensure_sqlite(self) -> sqlite3.Connection:
+        """Return the SQLite connection, opening it (and indexing the table) on first use"""
+        if self.sqlite_conn is None:
+            conn = sqlite3.connect(self.sqlite_path)
+            try:
+                conn.execute(QUALITY_INDEX_SQL)
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                # Read-only or busy database - the queries still work unindexed
+                print(f"⚠️  Could not create monitoring index: {e}")
+            self.sqlite_conn = conn
+        return self.sqlite_conn
     
     def get_collection_status(self) -> Dict:
         """Get current collection status from SQLite"""
         try:
-            conn = sqlite3.connect(self.sqlite_path)
+            conn = self._ensure_sqlite()
             cursor = conn.cursor()
             
-            # Basic stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_flights,
-                    MIN(collection_time) as first_collection,
-                    MAX(collection_time) as last_collection,
-                    COUNT(DISTINCT DATE(collection_time)) as collection_days
-                FROM flights
-            """)
-            basic_stats = cursor.fetchone()
-            
-            # Recent collection rate (last 2 hours)
-            cursor.execute("""
-                SELECT COUNT(*) as recent_flights
-                FROM flights 
-                WHERE collection_time > datetime('now', '-2 hours')
-            """)
-            recent_count = cursor.fetchone()[0]
-            
-            # Data quality indicators
+            # All dashboard metrics in one statement: whole-table stats, and
+            # the 2h rate plus 24h quality indicators from a single scan of the
+            # last 24h (comparisons are 0/1 in SQLite, so they can be summed
+            # directly without CASE branches)
             cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN latitude IS NULL OR longitude IS NULL THEN 1 ELSE 0 END) as missing_coords,
-                    SUM(CASE WHEN estimated_noise_db IS NULL THEN 1 ELSE 0 END) as missing_noise,
-                    SUM(CASE WHEN is_high_noise = 1 THEN 1 ELSE 0 END) as high_noise_flights,
-                    SUM(CASE WHEN is_over_house = 1 THEN 1 ELSE 0 END) as over_house_flights
-                FROM flights
-                WHERE collection_time > datetime('now', '-24 hours')
+                WITH basic AS (
+                    SELECT 
+                        COUNT(*) as total_flights,
+                        MIN(collection_time) as first_collection,
+                        MAX(collection_time) as last_collection,
+                        COUNT(DISTINCT DATE(collection_time)) as collection_days
+                    FROM flights
+                ),
+                recent AS (
+                    SELECT 
+                        COUNT(*) as total,
+                        SUM(collection_time > datetime('now', '-2 hours')) as recent_flights,
+                        SUM(latitude IS NULL OR longitude IS NULL) as missing_coords,
+                        COUNT(*) - COUNT(estimated_noise_db) as missing_noise,
+                        SUM(is_high_noise = 1) as high_noise_flights,
+                        SUM(is_over_house = 1) as over_house_flights
+                    FROM flights
+                    WHERE collection_time > datetime('now', '-24 hours')
+                )
+                SELECT * FROM basic, recent
             """)
-            quality_stats = cursor.fetchone()
+            stats = cursor.fetchone()
+            basic_stats = stats[:4]
+            recent_count = stats[5] or 0
+            quality_stats = stats[4:5] + stats[6:]
             
-            conn.close()
+            cursor.close()
             
             return {
                 'collection_status': {
@@ -93,12 +124,22 @@ class AviationMonitor:
             }
             
         except Exception as e:
+            if self.sqlite_conn is not None:
+                self.sqlite_conn.close()
+                self.sqlite_conn = None
             return {'error': f"SQLite connection failed: {e}"}
     
+    def _ensure_pg_pool(self) -> psycopg2.pool.ThreadedConnectionPool:
+        """Return the PostgreSQL connection pool, creating it on first use"""
+        if self.pg_pool is None:
+            self.pg_pool = psycopg2.pool.ThreadedConnectionPool(1, 2, **self.pg_params)
+        return self.pg_pool
+    
     def get_postgresql_status(self) -> Dict:
         """Get PostgreSQL analysis database status"""
+        conn = None
         try:
-            conn = psycopg2.connect(**self.pg_params)
+            conn = self._ensure_pg_pool().getconn()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
             # Check if tables exist and get record counts
@@ -134,7 +175,6 @@ class AviationMonitor:
                 latest_stats = None
             
             cursor.close()
-            conn.close()
             
             return {
                 'postgresql_status': {
@@ -147,9 +187,23 @@ class AviationMonitor:
             
         except Exception as e:
             return {'postgresql_status': {'connection': 'failed', 'error': str(e)}}
+        
+        finally:
+            # The pool rolls back the read transaction, or discards the
+            # connection if the server went away
+            if conn is not None:
+                self.pg_pool.putconn(conn)
     
     def validate_data_pipeline(self) -> Dict:
-        """Validate the data pipeline is working correctly"""
+        """
+        Validate the data pipeline is working correctly
+        
+        Results are reused for STATUS_TTL seconds, so a dashboard and a report
+        generated back to back query the databases once.
+        """
+        if self._last_status is not None and time.monotonic() - self._last_status[0] < STATUS_TTL:
+            return self._last_status[1]
+        
         sqlite_status = self.get_collection_status()
         pg_status = self.get_postgresql_status()
         
@@ -179,7 +233,7 @@ class AviationMonitor:
                 health_score -= 10
                 issues.append(f"High missing coordinates: {quality['missing_coordinates_pct']:.1f}%")
         
-        return {
+        status = {
             'pipeline_health': {
                 'score': max(0, health_score),
                 'status': 'healthy' if health_score >= 80 else 'warning' if health_score >= 50 else 'critical',
@@ -189,6 +243,8 @@ class AviationMonitor:
             'postgresql_status': pg_status,
             'timestamp': datetime.now().isoformat()
         }
+        self._last_status = (time.monotonic(), status)
+        return status
     
     def generate_daily_report(self) -> Dict:
         """Generate comprehensive daily report"""
@@ -3,12 +3,14 @@
 OpenSky 2025 Flight Data Collector
 Automated 24/7 data collection system optimized for OpenSky API limits
 """
+import functools
 import json
 import time
 import schedule
 import sqlite3
 from pathlib import Path
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 import logging
 from typing import Dict, List
@@ -19,6 +21,46 @@ import sys
 # Import our modules
 from opensky_fetcher import OpenSkyFetcher
 from schiphol_analyzer import SchipholFlightAnalyzer
+from spatial_kernels import distance_bearing
+
+# Connection-level tuning for the long-lived collector connection: WAL lets
+# readers (status, dashboard) run alongside the writer and NORMAL sync is
+# durable in WAL mode without an fsync on every commit
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+]
+
+# Store pandas timestamps in the same text form to_sql used
+sqlite3.register_adapter(pd.Timestamp, lambda ts: ts.isoformat(' '))
+
+# Columns written to the flights table, in insert order
+FLIGHT_COLUMNS = (
+    'collection_time', 'icao24', 'callsign', 'origin_country',
+    'time_position', 'last_contact', 'longitude', 'latitude',
+    'baro_altitude', 'on_ground', 'velocity', 'true_track',
+    'vertical_rate', 'geo_altitude', 'squawk', 'spi',
+    'position_source', 'area_type', 'distance_to_house_km',
+    'estimated_noise_db', 'schiphol_operation', 'approach_corridor',
+    'aircraft_category'
+)
+
+FLIGHT_PLACEHOLDER_ROW = f"({', '.join('?' * len(FLIGHT_COLUMNS))})"
+
+
+@functools.lru_cache(maxsize=32)
+def _insert_flights_sql(n_rows: int) -> str:
+    """Multi-row INSERT statement for n_rows flights (cached per row count)"""
+    return (f"INSERT INTO flights ({', '.join(FLIGHT_COLUMNS)}) "
+            f"VALUES {', '.join([FLIGHT_PLACEHOLDER_ROW] * n_rows)}")
+
+
+INSERT_COLLECTION_LOG_SQL = '''
+    INSERT INTO collection_log (timestamp, area_type, flights_collected, api_success, error_message)
+    VALUES (?, ?, ?, ?, ?)
+'''
 
 
 class OpenSky2025Collector:
@@ -45,7 +87,8 @@ class OpenSky2025Collector:
         # Collection settings optimized for OpenSky limits
         self.collection_settings = {
             # Collect every 5 minutes = 288 collections/day
-            # 288 * 2 API calls (local + schiphol) = 576 API calls/day
+            # 1 API call per collection (the local area is sliced out of the
+            # Schiphol area) = 288 API calls/day
             # Well under 4000 credit limit
             'interval_minutes': 5,
             
@@ -65,6 +108,9 @@ class OpenSky2025Collector:
         self.analyzer = SchipholFlightAnalyzer()
         self.running = False
         
+        # Collection log rows waiting for the end-of-cycle commit
+        self._pending_logs = []
+        
         # Statistics tracking
         self.stats = {
             'collections_today': 0,
@@ -79,7 +125,16 @@ class OpenSky2025Collector:
     
     def setup_database(self):
         """Setup SQLite database for efficient flight data storage"""
-        conn = sqlite3.connect(self.db_path)
+        # One connection for the lifetime of the collector
+        self.conn = sqlite3.connect(self.db_path)
+        for pragma in SQLITE_PRAGMAS:
+            self.conn.execute(pragma)
+        
+        # Flights per multi-row INSERT, bounded by the bound-parameter limit
+        # of this SQLite build (999 on old builds, 32766 on newer ones)
+        max_variables = self.conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        self.max_insert_rows = max(1, max_variables // len(FLIGHT_COLUMNS))
+        conn = self.conn
         
         # Main flights table - optimized for time-series data
         conn.execute('''
@@ -117,7 +172,17 @@ class OpenSky2025Collector:
         conn.execute('CREATE INDEX IF NOT EXISTS idx_collection_time ON flights(collection_time)')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_icao24_time ON flights(icao24, collection_time)')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_area_time ON flights(area_type, collection_time)')
-        conn.execute('CREATE INDEX IF NOT EXISTS idx_coordinates ON flights(latitude, longitude)')
+        self.setup_spatial_index(conn)
+        
+        # Indexed calendar date of collection_time (stored as
+        # 'YYYY-MM-DD HH:MM:SS...'), so per-day queries don't scan the table
+        flight_columns = {row[1] for row in conn.execute('PRAGMA table_xinfo(flights)')}
+        if 'collection_date' not in flight_columns:
+            conn.execute('''
+                ALTER TABLE flights ADD COLUMN collection_date TEXT
+                GENERATED ALWAYS AS (substr(collection_time, 1, 10)) VIRTUAL
+            ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_collection_date ON flights(collection_date)')
         
         # Daily statistics table
         conn.execute('''
@@ -146,9 +211,57 @@ class OpenSky2025Collector:
         ''')
         
         conn.commit()
-        conn.close()
         self.logger.info(f"Database initialized: {self.db_path}")
     
+    def setup_spatial_index(self, conn: sqlite3.Connection):
+        """
+        Maintain an R*Tree over flight positions for bounding-box queries
+        
+        A (latitude, longitude) B-tree can only range-scan on latitude, so a
+        bbox query reads the whole latitude band. The R*Tree shadow table is
+        kept in sync by triggers and backfilled once when it is created.
+        Falls back to the B-tree index if SQLite lacks the R*Tree module.
+        """
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'flights_rtree'"
+            ).fetchone()
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS flights_rtree
+                USING rtree(id, lat_min, lat_max, lon_min, lon_max)
+            ''')
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"R*Tree unavailable, using B-tree coordinate index: {e}")
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_coordinates ON flights(latitude, longitude)')
+            self.spatial_index = False
+            return
+        
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS flights_rtree_insert AFTER INSERT ON flights
+            WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+            BEGIN
+                INSERT INTO flights_rtree
+                VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS flights_rtree_delete AFTER DELETE ON flights
+            BEGIN
+                DELETE FROM flights_rtree WHERE id = OLD.id;
+            END
+        ''')
+        
+        if not exists:
+            conn.execute('''
+                INSERT INTO flights_rtree
+                SELECT id, latitude, latitude, longitude, longitude FROM flights
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            ''')
+        
+        # Replaced by the R*Tree (one less index to update on every insert)
+        conn.execute('DROP INDEX IF EXISTS idx_coordinates')
+        self.spatial_index = True
+    
     def load_credentials(self) -> Dict:
         """Load OpenSky credentials"""
         try:
@@ -162,45 +275,61 @@ class OpenSky2025Collector:
             self.logger.error(f"Error loading credentials: {e}")
             return {}
     
-    def collect_flight_data(self, area_type: str) -> pd.DataFrame:
-        """Collect flight data for specified area"""
+    def collect_flight_data(self) -> Dict[str, pd.DataFrame]:
+        """
+        Collect flight data for both areas with a single API call
+        
+        The local area lies inside the Schiphol area, so one request for the
+        Schiphol bounds covers both and the local flights are sliced out
+        client-side.
+        
+        Returns:
+            Dictionary of area type ('local', 'schiphol') -> flights
+        """
         if not self.fetcher:
             creds = self.load_credentials()
             self.fetcher = OpenSkyFetcher(**creds)
         
-        # Set appropriate bounds
-        if area_type == 'local':
-            self.fetcher.AMSTERDAM_NOORD_BOUNDS = self.collection_settings['local_bounds']
-        else:  # schiphol
-            self.fetcher.AMSTERDAM_NOORD_BOUNDS = self.collection_settings['schiphol_bounds']
-        
         try:
-            flights = self.fetcher.get_current_flights()
+            flights = self.fetcher.get_current_flights(bounds=self.collection_settings['schiphol_bounds'])
             self.stats['api_calls_today'] += 1
             
-            if not flights.empty:
-                # Add collection metadata
-                flights['collection_time'] = datetime.now()
-                flights['area_type'] = area_type
-                
-                # Enhance with analysis data
-                flights = self.enhance_flight_data(flights, area_type)
-                
-                self.logger.info(f"Collected {len(flights)} flights for {area_type} area")
+            if flights.empty:
+                for area_type in ('local', 'schiphol'):
+                    self.logger.info(f"No flights found in {area_type} area")
+                    self.log_collection(area_type, 0, True, None)
+                return {'local': pd.DataFrame(), 'schiphol': pd.DataFrame()}
+            
+            # Add collection metadata
+            flights['collection_time'] = datetime.now()
+            
+            # Enhance with analysis data (once, for both areas)
+            flights = self.enhance_flight_data(flights, 'schiphol')
+            
+            local = self.collection_settings['local_bounds']
+            in_local = (flights['latitude'].between(local['lat_min'], local['lat_max']) &
+                        flights['longitude'].between(local['lon_min'], local['lon_max']))
+            collected = {
+                'local': flights[in_local].assign(area_type='local'),
+                'schiphol': flights.assign(area_type='schiphol')
+            }
+            
+            for area_type, area_flights in collected.items():
+                if area_flights.empty:
+                    self.logger.info(f"No flights found in {area_type} area")
+                else:
+                    self.logger.info(f"Collected {len(area_flights)} flights for {area_type} area")
                 
                 # Log success
-                self.log_collection(area_type, len(flights), True, None)
-                
-                return flights
-            else:
-                self.logger.info(f"No flights found in {area_type} area")
-                self.log_collection(area_type, 0, True, None)
-                return pd.DataFrame()
+                self.log_collection(area_type, len(area_flights), True, None)
+            
+            return collected
                 
         except Exception as e:
-            self.logger.error(f"Error collecting {area_type} data: {e}")
-            self.log_collection(area_type, 0, False, str(e))
-            return pd.DataFrame()
+            self.logger.error(f"Error collecting flight data: {e}")
+            for area_type in ('local', 'schiphol'):
+                self.log_collection(area_type, 0, False, str(e))
+            return {'local': pd.DataFrame(), 'schiphol': pd.DataFrame()}
     
     def enhance_flight_data(self, flights: pd.DataFrame, area_type: str) -> pd.DataFrame:
         """Enhance flight data with analysis during collection"""
@@ -210,14 +339,12 @@ class OpenSky2025Collector:
         # Amsterdam Noord coordinates (your house)
         house_coords = (52.395, 4.915)
         
-        # Calculate distance to house
-        def calc_distance(row):
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                return float('inf')
-            from geopy.distance import geodesic
-            return geodesic((row['latitude'], row['longitude']), house_coords).kilometers
-        
-        flights['distance_to_house_km'] = flights.apply(calc_distance, axis=1)
+        # Calculate distance to house in one vectorized haversine pass
+        # (unknown position -> inf)
+        distance_km, _ = distance_bearing(
+            flights['latitude'].to_numpy(), flights['longitude'].to_numpy(), *house_coords
+        )
+        flights['distance_to_house_km'] = np.where(np.isnan(distance_km), np.inf, distance_km)
         
         # Estimate noise impact
         flights = self.analyzer.calculate_noise_impact(flights, house_coords)
@@ -227,93 +354,75 @@ class OpenSky2025Collector:
         
         # Enhanced aircraft classification
         if 'icao24' in flights.columns:
-            classifications = flights.apply(
-                lambda row: self.analyzer.classify_aircraft_by_icao(
-                    row.get('icao24', ''), 
-                    row.get('callsign', '')
-                ), axis=1
-            )
-            flights['aircraft_category'] = [c.get('category', 'Unknown') for c in classifications]
+            flights['aircraft_category'] = self.analyzer.classify_aircraft_by_icao_vec(
+                flights['icao24'], flights.get('callsign')
+            )['category']
         
         return flights
     
-    def store_flight_data(self, flights: pd.DataFrame):
-        """Store flight data in database"""
-        if flights.empty:
-            return
+    def store_flight_data(self, flights: pd.DataFrame) -> int:
+        """
+        Insert flight data into the database
         
-        conn = sqlite3.connect(self.db_path)
+        Does not commit; run_collection_cycle commits the flights together
+        with the cycle's collection log rows.
         
-        try:
-            # Select columns that match database schema
-            db_columns = [
-                'collection_time', 'icao24', 'callsign', 'origin_country',
-                'time_position', 'last_contact', 'longitude', 'latitude',
-                'baro_altitude', 'on_ground', 'velocity', 'true_track',
-                'vertical_rate', 'geo_altitude', 'squawk', 'spi',
-                'position_source', 'area_type', 'distance_to_house_km',
-                'estimated_noise_db', 'schiphol_operation', 'approach_corridor',
-                'aircraft_category'
-            ]
-            
-            # Ensure all columns exist in flights DataFrame
-            for col in db_columns:
-                if col not in flights.columns:
-                    if col in ['estimated_noise_db', 'distance_to_house_km']:
-                        flights[col] = 0.0
-                    else:
-                        flights[col] = None
-            
-            # Store to database
-            flights[db_columns].to_sql('flights', conn, if_exists='append', index=False)
-            
-            self.stats['flights_collected_today'] += len(flights)
-            self.logger.info(f"Stored {len(flights)} flights to database")
-            
-        except Exception as e:
-            self.logger.error(f"Error storing flight data: {e}")
-        finally:
-            conn.close()
+        Returns:
+            Number of flights inserted
+        """
+        if flights.empty:
+            return 0
+        
+        # Ensure all columns exist in flights DataFrame
+        for col in FLIGHT_COLUMNS:
+            if col not in flights.columns:
+                if col in ['estimated_noise_db', 'distance_to_house_km']:
+                    flights[col] = 0.0
+                else:
+                    flights[col] = None
+        
+        # Plain Python values with None for missing, as sqlite3 expects
+        frame = flights[list(FLIGHT_COLUMNS)].astype(object)
+        frame = frame.where(frame.notna(), None)
+        values = frame.to_numpy().ravel().tolist()
+        
+        # One multi-row INSERT per chunk of max_insert_rows flights
+        n_cols = len(FLIGHT_COLUMNS)
+        for start in range(0, len(frame), self.max_insert_rows):
+            chunk = values[start * n_cols:(start + self.max_insert_rows) * n_cols]
+            self.conn.execute(_insert_flights_sql(len(chunk) // n_cols), chunk)
+        
+        return len(frame)
     
     def log_collection(self, area_type: str, flights_count: int, success: bool, error_msg: str):
-        """Log collection attempt"""
-        conn = sqlite3.connect(self.db_path)
-        
-        conn.execute('''
-            INSERT INTO collection_log (timestamp, area_type, flights_collected, api_success, error_message)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (datetime.now(), area_type, flights_count, success, error_msg))
-        
-        conn.commit()
-        conn.close()
+        """Queue a collection log row (written with the cycle's flights)"""
+        self._pending_logs.append((datetime.now(), area_type, flights_count, success, error_msg))
     
     def update_daily_stats(self):
         """Update daily statistics"""
         today = datetime.now().date()
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.conn
         
-        # Get today's statistics
+        # Get today's statistics (one pass over flights, one over the log)
         today_stats = conn.execute('''
             SELECT 
                 COUNT(*) as total_flights,
-                COUNT(CASE WHEN area_type = 'local' THEN 1 END) as local_flights,
-                COUNT(CASE WHEN area_type = 'schiphol' THEN 1 END) as schiphol_flights,
+                COALESCE(SUM(area_type = 'local'), 0) as local_flights,
+                COALESCE(SUM(area_type = 'schiphol'), 0) as schiphol_flights,
                 COUNT(DISTINCT icao24) as unique_aircraft,
-                COUNT(CASE WHEN estimated_noise_db >= 65 THEN 1 END) as high_noise_flights
+                COALESCE(SUM(estimated_noise_db >= 65), 0) as high_noise_flights
             FROM flights 
-            WHERE DATE(collection_time) = ?
-        ''', (today,)).fetchone()
-        
-        collections_today = conn.execute('''
-            SELECT COUNT(*) FROM collection_log 
-            WHERE DATE(timestamp) = ? AND api_success = 1
-        ''', (today,)).fetchone()[0]
+            WHERE collection_date = ?
+        ''', (today.isoformat(),)).fetchone()
         
-        errors_today = conn.execute('''
-            SELECT COUNT(*) FROM collection_log 
-            WHERE DATE(timestamp) = ? AND api_success = 0
-        ''', (today,)).fetchone()[0]
+        collections_today, errors_today = conn.execute('''
+            SELECT 
+                COALESCE(SUM(api_success = 1), 0),
+                COALESCE(SUM(api_success = 0), 0)
+            FROM collection_log 
+            WHERE DATE(timestamp) = ?
+        ''', (today,)).fetchone()
         
         # Insert or update daily stats
         conn.execute('''
@@ -326,7 +435,6 @@ class OpenSky2025Collector:
               today_stats[3], today_stats[4], errors_today))
         
         conn.commit()
-        conn.close()
     
     def run_collection_cycle(self):
         """Run one complete collection cycle"""
@@ -343,18 +451,22 @@ class OpenSky2025Collector:
             }
             self.logger.info("Reset daily statistics for new day")
         
-        # Collect local area data
-        local_flights = self.collect_flight_data('local')
-        if not local_flights.empty:
-            self.store_flight_data(local_flights)
+        # Collect local and Schiphol area data (one API call)
+        collected = [flights for flights in self.collect_flight_data().values() if not flights.empty]
+        flights = pd.concat(collected, ignore_index=True) if collected else pd.DataFrame()
         
-        # Small delay between API calls
-        time.sleep(2)
-        
-        # Collect Schiphol area data
-        schiphol_flights = self.collect_flight_data('schiphol')
-        if not schiphol_flights.empty:
-            self.store_flight_data(schiphol_flights)
+        # Write the cycle's flights and collection log in a single transaction
+        try:
+            with self.conn:
+                stored = self.store_flight_data(flights)
+                self.conn.executemany(INSERT_COLLECTION_LOG_SQL, self._pending_logs)
+            if stored:
+                self.stats['flights_collected_today'] += stored
+                self.logger.info(f"Stored {stored} flights to database")
+        except Exception as e:
+            self.logger.error(f"Error storing flight data: {e}")
+        finally:
+            self._pending_logs = []
         
         # Update statistics
         self.stats['collections_today'] += 1
@@ -383,8 +495,15 @@ class OpenSky2025Collector:
             schedule.run_pending()
             time.sleep(10)  # Check every 10 seconds
         
+        self.close()
         self.logger.info("Automated collection stopped")
     
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+    
     def signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
         self.logger.info(f"Received signal {signum}, shutting down gracefully...")
@@ -392,11 +511,11 @@ class OpenSky2025Collector:
     
     def get_collection_status(self) -> Dict:
         """Get current collection status"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.conn
         
         # Get overall statistics
         total_flights = conn.execute('SELECT COUNT(*) FROM flights').fetchone()[0]
-        total_days = conn.execute('SELECT COUNT(DISTINCT DATE(collection_time)) FROM flights').fetchone()[0]
+        total_days = conn.execute('SELECT COUNT(DISTINCT collection_date) FROM flights').fetchone()[0]
         
         # Get today's statistics
         today = datetime.now().date()
@@ -407,10 +526,8 @@ class OpenSky2025Collector:
                 MIN(collection_time) as first_collection,
                 MAX(collection_time) as last_collection
             FROM flights 
-            WHERE DATE(collection_time) = ?
-        ''', (today,)).fetchone()
-        
-        conn.close()
+            WHERE collection_date = ?
+        ''', (today.isoformat(),)).fetchone()
         
         return {
             'total_flights_collected': total_flights,
@@ -422,6 +539,33 @@ class OpenSky2025Collector:
             'api_calls_today': self.stats['api_calls_today'],
             'collections_today': self.stats['collections_today']
         }
+    
+    def get_flights_in_bounds(self, bounds: Dict) -> pd.DataFrame:
+        """
+        Get stored flights whose position lies within a bounding box
+        
+        Args:
+            bounds: Bounding box (lat_min/lat_max/lon_min/lon_max)
+        
+        Returns:
+            DataFrame of matching flights
+        """
+        box = (bounds['lat_min'], bounds['lat_max'], bounds['lon_min'], bounds['lon_max'])
+        
+        if not self.spatial_index:
+            return pd.read_sql_query('''
+                SELECT * FROM flights
+                WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+            ''', self.conn, params=box)
+        
+        # The R*Tree stores float32 boxes rounded outwards, so it selects a
+        # superset that the exact comparison on flights then trims
+        return pd.read_sql_query('''
+            SELECT f.* FROM flights_rtree r
+            JOIN flights f ON f.id = r.id
+            WHERE r.lat_max >= ? AND r.lat_min <= ? AND r.lon_max >= ? AND r.lon_min <= ?
+              AND f.latitude BETWEEN ? AND ? AND f.longitude BETWEEN ? AND ?
+        ''', self.conn, params=box + box)
 
 
 def main():
@@ -459,6 +603,8 @@ def main():
     
     else:
         parser.print_help()
+    
+    collector.close()
 
 
 if __name__ == "__main__":
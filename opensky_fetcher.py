@@ -1,13 +1,44 @@
 """
 OpenSky Network API client for Amsterdam Noord flight analysis
 """
-import requests
+import httpx
+import numpy as np
 import pandas as pd
 import time
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 import json
 
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:  # h2 is optional - fall back to pooled HTTP/1.1
+    HTTP2_AVAILABLE = False
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional - stdlib decoder accepts bytes too
+    _json_loads = json.loads
+
+# Rough aircraft type by first ICAO24 character (anything else is 'Other')
+AIRCRAFT_TYPE_BY_PREFIX = {
+    **dict.fromkeys('4DGFIN', 'Commercial'),
+    **dict.fromkeys('AC', 'Private/General Aviation'),
+}
+
+
+def _build_aircraft_type_table() -> np.ndarray:
+    """Aircraft type indexed by the code point of the first ICAO24 character (0 = no address)"""
+    table = np.full(256, 'Other', dtype=object)
+    table[0] = 'Unknown'
+    for prefix, aircraft_type in AIRCRAFT_TYPE_BY_PREFIX.items():
+        table[[ord(prefix), ord(prefix.lower())]] = aircraft_type
+    return table
+
+
+AIRCRAFT_TYPE_TABLE = _build_aircraft_type_table()
+
 
 class OpenSkyFetcher:
     """Client for fetching flight data from OpenSky Network API"""
@@ -34,9 +65,16 @@ class OpenSkyFetcher:
             username: Legacy username (for older accounts)
             password: Legacy password (for older accounts)
         """
-        self.session = requests.Session()
+        # One pooled client shared by every request (and every snapshot thread)
+        self.session = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            timeout=30,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=8)
+        )
         self.access_token = None
         self.token_expires_at = None
+        self._auth_headers = ({}, None)  # (headers, token they were built for)
         
         # Prefer OAuth2 credentials
         if client_id and client_secret:
@@ -94,26 +132,43 @@ class OpenSkyFetcher:
         """Get authentication headers for API requests"""
         if self.auth_method == 'oauth2':
             if self._get_oauth2_token():
-                return {'Authorization': f'Bearer {self.access_token}'}
+                # Reuse the header dict until the token is refreshed
+                headers, token = self._auth_headers
+                if token != self.access_token:
+                    headers = {'Authorization': f'Bearer {self.access_token}'}
+                    self._auth_headers = (headers, self.access_token)
+                return headers
             else:
                 return {}
         return {}
+    
+    def _bbox_params(self, bounds: Optional[dict]) -> dict:
+        """Query parameters for a bounding box (defaults to Amsterdam Noord, {} = global)"""
+        if bounds is None:
+            bounds = self.AMSTERDAM_NOORD_BOUNDS
+        if not bounds:
+            return {}
+        return {
+            'lamin': bounds['lat_min'],
+            'lamax': bounds['lat_max'],
+            'lomin': bounds['lon_min'],
+            'lomax': bounds['lon_max']
+        }
         
-    def get_current_flights(self) -> pd.DataFrame:
+    def get_current_flights(self, bounds: Optional[dict] = None) -> pd.DataFrame:
         """
         Get current flights over Amsterdam Noord
         
+        Args:
+            bounds: Bounding box (lat_min/lat_max/lon_min/lon_max) to query
+                    instead of Amsterdam Noord; an empty dict means global
+        
         Returns:
             DataFrame with current flight data
         """
         url = f"{self.BASE_URL}/states/all"
         
-        params = {
-            'lamin': self.AMSTERDAM_NOORD_BOUNDS['lat_min'],
-            'lamax': self.AMSTERDAM_NOORD_BOUNDS['lat_max'],
-            'lomin': self.AMSTERDAM_NOORD_BOUNDS['lon_min'],
-            'lomax': self.AMSTERDAM_NOORD_BOUNDS['lon_max']
-        }
+        params = self._bbox_params(bounds)
         
         try:
             headers = self._get_auth_headers()
@@ -121,7 +176,8 @@ class OpenSkyFetcher:
                                       auth=self.auth, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            data = _json_loads(response.content)
             
             if not data or 'states' not in data or not data['states']:
                 print("No flights found in Amsterdam Noord area")
@@ -141,19 +197,20 @@ class OpenSkyFetcher:
             
             return self._clean_flight_data(df)
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Error fetching data from OpenSky API: {e}")
             return pd.DataFrame()
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
             return pd.DataFrame()
     
-    def get_historical_flights(self, hours_back: int = 1) -> pd.DataFrame:
+    def get_historical_flights(self, hours_back: int = 1, bounds: Optional[dict] = None) -> pd.DataFrame:
         """
         Get historical flights for the past N hours
         
         Args:
             hours_back: Number of hours to look back (max 1 for free accounts)
+            bounds: Bounding box to query instead of Amsterdam Noord
         
         Returns:
             DataFrame with historical flight data
@@ -167,13 +224,7 @@ class OpenSkyFetcher:
         
         url = f"{self.BASE_URL}/states/all"
         
-        params = {
-            'time': begin_time,
-            'lamin': self.AMSTERDAM_NOORD_BOUNDS['lat_min'],
-            'lamax': self.AMSTERDAM_NOORD_BOUNDS['lat_max'],
-            'lomin': self.AMSTERDAM_NOORD_BOUNDS['lon_min'],
-            'lomax': self.AMSTERDAM_NOORD_BOUNDS['lon_max']
-        }
+        params = {'time': begin_time, **self._bbox_params(bounds)}
         
         try:
             headers = self._get_auth_headers()
@@ -181,7 +232,7 @@ class OpenSkyFetcher:
                                       auth=self.auth, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            data = _json_loads(response.content)
             
             if not data or 'states' not in data or not data['states']:
                 print(f"No historical flights found for {hours_back} hours back")
@@ -200,7 +251,7 @@ class OpenSkyFetcher:
             
             return self._clean_flight_data(df)
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Error fetching historical data: {e}")
             return pd.DataFrame()
     
@@ -215,36 +266,32 @@ class OpenSkyFetcher:
         # Convert numeric columns
         numeric_cols = ['longitude', 'latitude', 'baro_altitude', 'velocity', 
                        'true_track', 'vertical_rate', 'geo_altitude']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
             
         # Filter out invalid coordinates
         df = df.dropna(subset=['longitude', 'latitude'])
         df = df[(df['longitude'] != 0) | (df['latitude'] != 0)]
         
         # Add aircraft type classification
-        df['aircraft_type'] = df['icao24'].apply(self._classify_aircraft)
+        df['aircraft_type'] = self._classify_aircraft(df['icao24'])
         
         return df
     
-    def _classify_aircraft(self, icao24: str) -> str:
+    def _classify_aircraft(self, icao24: pd.Series) -> pd.Series:
         """
         Basic aircraft type classification based on ICAO24 prefix
         This is a simplified classification - more sophisticated methods exist
+        
+        Args:
+            icao24: ICAO24 addresses
+        
+        Returns:
+            Aircraft type per address ('Unknown' for missing/empty addresses)
         """
-        if not icao24:
-            return 'Unknown'
-            
         # This is a basic heuristic - you might want to use a proper aircraft database
-        icao24 = icao24.upper()
-        
-        # European aircraft codes (rough classification)
-        if icao24.startswith(('4', 'D', 'G', 'F', 'I', 'N')):
-            return 'Commercial'
-        elif icao24.startswith(('A', 'C')):
-            return 'Private/General Aviation'
-        else:
-            return 'Other'
+        # First character's code point ('' -> 0), looked up in one gather
+        codes = icao24.fillna('').to_numpy(dtype='U1').view(np.uint32)
+        return pd.Series(AIRCRAFT_TYPE_TABLE[np.minimum(codes, 255)], index=icao24.index)
 
 
 if __name__ == "__main__":
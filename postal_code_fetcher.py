@@ -4,9 +4,14 @@ Fetch precise postal code boundaries for Netherlands from official PDOK service
 import requests
 import geopandas as gpd
 from shapely.geometry import Point, Polygon
+from shapely import wkt
 import json
 from typing import Optional, Tuple, List
 import os
+import time
+
+# Cached postcode-vs-Schiphol analyses older than this are recomputed
+POSTCODE_ANALYSIS_MAX_AGE_DAYS = 30
 
 
 class PostalCodeFetcher:
@@ -133,6 +138,9 @@ class AmsterdamAreas:
         
         # Common Amsterdam Noord postal codes
         self.noord_postcodes = ['1031', '1032', '1033', '1034', '1035', '1036']
+        
+        # In-process results of analyze_postcode_vs_schiphol
+        self._postcode_analyses = {}
     
     def get_schiphol_approach_area(self) -> dict:
         """
@@ -151,7 +159,45 @@ class AmsterdamAreas:
         }
     
     def analyze_postcode_vs_schiphol(self, postcode: str) -> dict:
-        """Compare postal code area with Schiphol proximity"""
+        """
+        Compare postal code area with Schiphol proximity
+        
+        Results are memoized in-process and cached on disk (next to the
+        boundary cache) for POSTCODE_ANALYSIS_MAX_AGE_DAYS days.
+        """
+        if postcode in self._postcode_analyses:
+            return self._postcode_analyses[postcode]
+        
+        cache_file = os.path.join(self.pc_fetcher.cache_dir, f"pc4_{postcode}_schiphol.json")
+        max_age = POSTCODE_ANALYSIS_MAX_AGE_DAYS * 86400
+        
+        analysis = None
+        try:
+            if time.time() - os.stat(cache_file).st_mtime < max_age:
+                with open(cache_file, 'r') as f:
+                    analysis = json.load(f)
+                analysis["geometry"] = wkt.loads(analysis["geometry"])
+                analysis["schiphol_coords"] = tuple(analysis["schiphol_coords"])
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable postcode cache {cache_file}: {e}")
+            analysis = None
+        
+        if analysis is None:
+            analysis = self._compute_postcode_vs_schiphol(postcode)
+            if "error" not in analysis:
+                try:
+                    with open(cache_file, 'w') as f:
+                        json.dump({**analysis, "geometry": analysis["geometry"].wkt}, f)
+                except OSError as e:
+                    print(f"Could not cache postcode analysis: {e}")
+        
+        if "error" not in analysis:
+            self._postcode_analyses[postcode] = analysis
+        return analysis
+    
+    def _compute_postcode_vs_schiphol(self, postcode: str) -> dict:
+        """Compare postal code area with Schiphol proximity (uncached)"""
         pc_info = self.pc_fetcher.get_postcode_info(postcode)
         
         if "error" in pc_info:
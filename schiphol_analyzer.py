@@ -7,8 +7,39 @@ import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import json
-from geopy.distance import geodesic
-import math
+
+from frame_memo import FrameMemo
+from spatial_kernels import distance_bearing, estimate_noise_db
+
+# Every value identify_schiphol_operations can assign to 'schiphol_operation'
+SCHIPHOL_OPERATION_TYPES = [
+    'Landing/Takeoff', 'Airport Vicinity', 'Approach/Departure', 'Transit (Low)',
+    'Extended Approach', 'Transit (Medium)', 'Transit (High)', 'Unknown'
+]
+
+# Operation types that are actual Schiphol arrivals/departures
+CONFIRMED_SCHIPHOL_OPERATIONS = ['Landing/Takeoff', 'Approach/Departure', 'Extended Approach']
+
+# ICAO24 first characters by likely registration region
+EUROPEAN_ICAO_PREFIXES = ('4', 'D', 'G', 'F', 'I')
+NORTH_AMERICAN_ICAO_PREFIXES = ('A', 'C')  # Often private/corporate
+
+# Callsign prefixes of major airlines seen at Schiphol
+AIRLINE_CALLSIGN_PATTERNS = {
+    'KLM': {'type': 'Commercial Airline', 'category': 'Major Carrier'},
+    'TRA': {'type': 'Transavia', 'category': 'Low Cost Carrier'},
+    'EZY': {'type': 'EasyJet', 'category': 'Low Cost Carrier'},
+    'RYR': {'type': 'Ryanair', 'category': 'Low Cost Carrier'},
+    'BAW': {'type': 'British Airways', 'category': 'Major Carrier'},
+    'DLH': {'type': 'Lufthansa', 'category': 'Major Carrier'},
+    'AFR': {'type': 'Air France', 'category': 'Major Carrier'},
+    'UAE': {'type': 'Emirates', 'category': 'Major Carrier'},
+    'QTR': {'type': 'Qatar Airways', 'category': 'Major Carrier'},
+}
+
+# Registration-style callsign prefixes; short ones are typically private aircraft
+PRIVATE_CALLSIGN_PREFIXES = ('N', 'G-', 'PH-', 'D-', 'F-')
+PRIVATE_CALLSIGN_MAX_LEN = 6
 
 
 class SchipholFlightAnalyzer:
@@ -48,6 +79,10 @@ class SchipholFlightAnalyzer:
             'southwest': {'bearing_range': (225, 270), 'description': 'Southwestern approach'},
             'west': {'bearing_range': (270, 315), 'description': 'Western approach (over North Sea)'}
         }
+        
+        # Last identify_schiphol_operations(..., memoize=True) input/result, so
+        # re-analysing the same DataFrame skips the classifier
+        self._operations_memo = FrameMemo()
     
     def classify_aircraft_by_icao(self, icao24: str, callsign: str = None) -> Dict[str, str]:
         """
@@ -73,10 +108,10 @@ class SchipholFlightAnalyzer:
         }
         
         # Basic classification by ICAO24 prefix (country/region codes)
-        if icao24.startswith(('4', 'D', 'G', 'F', 'I')):  # Europe
+        if icao24.startswith(EUROPEAN_ICAO_PREFIXES):  # Europe
             classification['likely_commercial'] = True
             classification['category'] = 'Commercial'
-        elif icao24.startswith(('A', 'C')):  # North America (often private/corporate)
+        elif icao24.startswith(NORTH_AMERICAN_ICAO_PREFIXES):  # North America (often private/corporate)
             classification['likely_private'] = True
             classification['category'] = 'Private/Corporate'
         elif icao24.startswith('PH'):  # Netherlands prefix
@@ -87,32 +122,79 @@ class SchipholFlightAnalyzer:
             callsign = callsign.strip().upper()
             
             # Major airlines
-            airline_patterns = {
-                'KLM': {'type': 'Commercial Airline', 'category': 'Major Carrier'},
-                'TRA': {'type': 'Transavia', 'category': 'Low Cost Carrier'},
-                'EZY': {'type': 'EasyJet', 'category': 'Low Cost Carrier'},
-                'RYR': {'type': 'Ryanair', 'category': 'Low Cost Carrier'},
-                'BAW': {'type': 'British Airways', 'category': 'Major Carrier'},
-                'DLH': {'type': 'Lufthansa', 'category': 'Major Carrier'},
-                'AFR': {'type': 'Air France', 'category': 'Major Carrier'},
-                'UAE': {'type': 'Emirates', 'category': 'Major Carrier'},
-                'QTR': {'type': 'Qatar Airways', 'category': 'Major Carrier'},
-            }
-            
-            for pattern, info in airline_patterns.items():
+            for pattern, info in AIRLINE_CALLSIGN_PATTERNS.items():
                 if callsign.startswith(pattern):
                     classification.update(info)
                     classification['likely_commercial'] = True
                     break
             
             # Private/corporate patterns
-            if any(callsign.startswith(p) for p in ['N', 'G-', 'PH-', 'D-', 'F-']):
-                if len(callsign) <= 6:  # Typical private aircraft callsign length
+            if callsign.startswith(PRIVATE_CALLSIGN_PREFIXES):
+                if len(callsign) <= PRIVATE_CALLSIGN_MAX_LEN:  # Typical private aircraft callsign length
                     classification['likely_private'] = True
                     classification['category'] = 'Private/General Aviation'
         
         return classification
     
+    def classify_aircraft_by_icao_vec(self, icao24: pd.Series, callsign: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        Vectorized classify_aircraft_by_icao over whole columns
+        
+        Args:
+            icao24: ICAO 24-bit address per flight
+            callsign: Callsign per flight (optional)
+            
+        Returns:
+            DataFrame with the classification fields as columns (type,
+            category, noise_level, likely_commercial, likely_private),
+            aligned with icao24
+        """
+        raw_icao = icao24.fillna('').astype(str)
+        icao = raw_icao.str.upper().str.strip()
+        if callsign is None:
+            callsign = pd.Series('', index=icao24.index)
+        callsign = callsign.fillna('').astype(str).str.strip().str.upper()
+        
+        # Basic classification by ICAO24 prefix (country/region codes)
+        likely_commercial = icao.str.startswith(EUROPEAN_ICAO_PREFIXES).to_numpy()
+        likely_private = ~likely_commercial & icao.str.startswith(NORTH_AMERICAN_ICAO_PREFIXES).to_numpy()
+        category = np.select(
+            [likely_commercial, likely_private, icao.str.startswith('PH').to_numpy()],
+            ['Commercial', 'Private/Corporate', 'Netherlands Registered'],
+            default='Unknown'
+        ).astype(object)
+        aircraft_type = np.full(len(icao), 'Unknown', dtype=object)
+        
+        # Major airlines (the patterns are all three letters, so at most one matches)
+        airline = callsign.str[:3].map(
+            {pattern: info['type'] for pattern, info in AIRLINE_CALLSIGN_PATTERNS.items()}
+        ).notna().to_numpy()
+        prefix = callsign.str[:3].to_numpy()[airline]
+        aircraft_type[airline] = [AIRLINE_CALLSIGN_PATTERNS[p]['type'] for p in prefix]
+        category[airline] = [AIRLINE_CALLSIGN_PATTERNS[p]['category'] for p in prefix]
+        likely_commercial = likely_commercial | airline
+        
+        # Private/corporate patterns
+        private = (callsign.str.startswith(PRIVATE_CALLSIGN_PREFIXES)
+                   & (callsign.str.len() <= PRIVATE_CALLSIGN_MAX_LEN)).to_numpy()
+        category[private] = 'Private/General Aviation'
+        likely_private = likely_private | private
+        
+        result = pd.DataFrame({
+            'type': aircraft_type,
+            'category': category,
+            'noise_level': 'Unknown',
+            'likely_commercial': likely_commercial.astype(object),
+            'likely_private': likely_private.astype(object)
+        }, index=icao24.index)
+        
+        # No address at all: the scalar version returns only type/category/noise_level
+        missing = (raw_icao == '').to_numpy()
+        if missing.any():
+            result.loc[missing, ['type', 'category']] = 'Unknown'
+            result.loc[missing, ['likely_commercial', 'likely_private']] = 'Unknown'
+        return result
+    
     def calculate_noise_impact(self, flight_data: pd.DataFrame, target_coords: Tuple[float, float]) -> pd.DataFrame:
         """
         Calculate estimated noise impact for flights over a specific location
@@ -129,54 +211,36 @@ class SchipholFlightAnalyzer:
         
         df = flight_data.copy()
         
-        # Calculate distance from target location
-        def calc_distance(row):
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                return float('inf')
-            return geodesic((row['latitude'], row['longitude']), target_coords).kilometers
-        
-        df['distance_km'] = df.apply(calc_distance, axis=1)
+        # Calculate distance from target location (unknown position -> inf)
+        distance_km, _ = distance_bearing(df['latitude'].to_numpy(), df['longitude'].to_numpy(), *target_coords)
+        df['distance_km'] = np.where(np.isnan(distance_km), np.inf, distance_km)
         
         # Estimate noise level based on altitude and distance
-        def estimate_noise(row):
-            if pd.isna(row['baro_altitude']) or row['distance_km'] == float('inf'):
-                return 0
-            
-            altitude_ft = max(row['baro_altitude'], 100)  # Avoid division by zero
-            distance_km = max(row['distance_km'], 0.1)
-            
-            # Basic noise model: higher altitude = less noise, closer distance = more noise
-            # This is a simplified model - real noise depends on many factors
-            base_noise = 80  # Base noise level for jet aircraft
-            altitude_reduction = min(altitude_ft / 1000 * 5, 40)  # Reduce 5dB per 1000ft, max 40dB
-            distance_reduction = min(distance_km * 2, 20)  # Reduce 2dB per km, max 20dB
-            
-            estimated_noise = max(base_noise - altitude_reduction - distance_reduction, 30)
-            return round(estimated_noise, 1)
-        
-        df['estimated_noise_db'] = df.apply(estimate_noise, axis=1)
+        df['estimated_noise_db'] = np.round(
+            estimate_noise_db(df['baro_altitude'].to_numpy(dtype=np.float64), df['distance_km'].to_numpy()), 1
+        )
         
         # Classify noise impact level
-        def noise_impact_level(noise_db):
-            if noise_db >= 65:
-                return 'High Impact'
-            elif noise_db >= 55:
-                return 'Moderate Impact'  
-            elif noise_db >= 45:
-                return 'Low Impact'
-            else:
-                return 'Minimal Impact'
-        
-        df['noise_impact'] = df['estimated_noise_db'].apply(noise_impact_level)
+        noise_db = df['estimated_noise_db'].to_numpy()
+        df['noise_impact'] = np.select(
+            [noise_db >= 65, noise_db >= 55, noise_db >= 45],
+            ['High Impact', 'Moderate Impact', 'Low Impact'],
+            default='Minimal Impact'
+        )
         
         return df
     
-    def identify_schiphol_operations(self, flight_data: pd.DataFrame) -> pd.DataFrame:
+    def identify_schiphol_operations(self, flight_data: pd.DataFrame,
+                                     memoize: bool = False) -> pd.DataFrame:
         """
         Identify flights that are likely Schiphol arrivals or departures
         
         Args:
             flight_data: DataFrame with flight data
+            memoize: Reuse the result when called again with the same,
+                     unchanged DataFrame (see FrameMemo for the staleness
+                     contract). Leave off for one-shot calls on fresh frames,
+                     such as the collectors' per-cycle data.
             
         Returns:
             DataFrame with Schiphol operation classifications
@@ -184,81 +248,59 @@ class SchipholFlightAnalyzer:
         if flight_data.empty:
             return flight_data
         
-        df = flight_data.copy()
-        
-        # Calculate distance from Schiphol
-        def distance_to_schiphol(row):
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                return float('inf')
-            return geodesic((row['latitude'], row['longitude']), self.schiphol_coords).kilometers
+        if memoize:
+            cached = self._operations_memo.get(flight_data)
+            if cached is not None:
+                return cached.copy()
         
-        df['distance_to_schiphol_km'] = df.apply(distance_to_schiphol, axis=1)
-        
-        # Calculate bearing from Schiphol (for approach/departure analysis)
-        def bearing_from_schiphol(row):
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                return None
-            
-            lat1, lon1 = math.radians(self.schiphol_coords[0]), math.radians(self.schiphol_coords[1])
-            lat2, lon2 = math.radians(row['latitude']), math.radians(row['longitude'])
-            
-            dlon = lon2 - lon1
-            y = math.sin(dlon) * math.cos(lat2)
-            x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
-            
-            bearing = math.atan2(y, x)
-            bearing = math.degrees(bearing)
-            bearing = (bearing + 360) % 360  # Normalize to 0-360
-            
-            return round(bearing, 1)
+        df = flight_data.copy()
         
-        df['bearing_from_schiphol'] = df.apply(bearing_from_schiphol, axis=1)
+        # Distance and bearing from Schiphol (for approach/departure analysis)
+        # in one vectorized pass; unknown positions get inf / NaN
+        distance, bearing = distance_bearing(
+            df['latitude'].to_numpy(), df['longitude'].to_numpy(), *self.schiphol_coords
+        )
+        distance = np.where(np.isnan(distance), np.inf, distance)
+        df['distance_to_schiphol_km'] = distance
+        df['bearing_from_schiphol'] = np.round(bearing, 1)
         
         # Classify operation type based on distance, altitude, and patterns
-        def classify_operation(row):
-            distance = row['distance_to_schiphol_km']
-            altitude = row.get('baro_altitude', 0)
-            
-            if distance == float('inf'):
-                return 'Unknown'
-            elif distance < 5:  # Very close to Schiphol
-                if altitude < 1000:
-                    return 'Landing/Takeoff'
-                else:
-                    return 'Airport Vicinity'
-            elif distance < 15:  # Approach/departure area
-                if altitude < 5000:
-                    return 'Approach/Departure'
-                else:
-                    return 'Transit (Low)'
-            elif distance < 30:  # Extended approach area
-                if altitude < 10000:
-                    return 'Extended Approach'
-                else:
-                    return 'Transit (Medium)'
-            else:
-                return 'Transit (High)'
-        
-        df['schiphol_operation'] = df.apply(classify_operation, axis=1)
+        # (conditions are checked in order, first match wins)
+        altitude = df['baro_altitude'].to_numpy(dtype=np.float64) if 'baro_altitude' in df.columns else np.zeros(len(df))
+        df['schiphol_operation'] = np.select(
+            [
+                np.isinf(distance),
+                (distance < 5) & (altitude < 1000),
+                distance < 5,
+                (distance < 15) & (altitude < 5000),
+                distance < 15,
+                (distance < 30) & (altitude < 10000),
+                distance < 30
+            ],
+            [
+                'Unknown', 'Landing/Takeoff', 'Airport Vicinity', 'Approach/Departure',
+                'Transit (Low)', 'Extended Approach', 'Transit (Medium)'
+            ],
+            default='Transit (High)'
+        )
         
         # Identify approach corridor
-        def identify_corridor(bearing):
-            if pd.isna(bearing):
-                return 'Unknown'
-            
-            for corridor_name, corridor_info in self.approach_corridors.items():
-                start, end = corridor_info['bearing_range']
-                if start <= end:  # Normal range
-                    if start <= bearing <= end:
-                        return corridor_name
-                else:  # Range crosses 0 degrees (e.g., 315-45)
-                    if bearing >= start or bearing <= end:
-                        return corridor_name
-            
-            return 'Other'
-        
-        df['approach_corridor'] = df['bearing_from_schiphol'].apply(identify_corridor)
-        
+        bearing = df['bearing_from_schiphol'].to_numpy()
+        corridor_masks = []
+        for corridor_info in self.approach_corridors.values():
+            start, end = corridor_info['bearing_range']
+            if start <= end:  # Normal range
+                corridor_masks.append((bearing >= start) & (bearing <= end))
+            else:  # Range crosses 0 degrees (e.g., 315-45)
+                corridor_masks.append((bearing >= start) | (bearing <= end))
+        df['approach_corridor'] = np.select(
+            [np.isnan(bearing)] + corridor_masks,
+            ['Unknown'] + list(self.approach_corridors),
+            default='Other'
+        )
+        
+        if memoize:
+            self._operations_memo.put(flight_data, df)
         return df
     
     def analyze_residential_impact(self, flight_data: pd.DataFrame, 
@@ -285,15 +327,10 @@ class SchipholFlightAnalyzer:
         
         # Add enhanced aircraft classification
         if 'icao24' in df.columns:
-            classifications = df.apply(
-                lambda row: self.classify_aircraft_by_icao(
-                    row.get('icao24', ''), 
-                    row.get('callsign', '')
-                ), axis=1
-            )
+            classifications = self.classify_aircraft_by_icao_vec(df['icao24'], df.get('callsign'))
             
             for key in ['type', 'category', 'likely_commercial', 'likely_private']:
-                df[f'aircraft_{key}'] = [c.get(key, 'Unknown') for c in classifications]
+                df[f'aircraft_{key}'] = classifications[key]
         
         # Analysis results
         analysis = {
@@ -0,0 +1,190 @@
+"""
+Spatial indexing helpers for bounding-box queries over flight positions
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional - fall back to numpy broadcasting
+    njit = None
+
+
+class LatSortedIndex:
+    """
+    Latitude-sorted index over flight positions
+    
+    Built once per analysis; each bounding-box query binary-searches the
+    latitude band and only compares longitudes inside it, instead of
+    scanning every row.
+    """
+    
+    def __init__(self, lat: np.ndarray, lon: np.ndarray):
+        """
+        Build the index
+        
+        Args:
+            lat: Latitude per row
+            lon: Longitude per row (same length as lat)
+        """
+        self.order = np.argsort(lat, kind='stable')  # NaNs sort to the end
+        self.lat = np.asarray(lat)[self.order]
+        self.lon = np.asarray(lon)[self.order]
+    
+    def query(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+        """
+        Find rows inside a bounding box (edges inclusive)
+        
+        Returns:
+            Ascending row positions into the original arrays
+        """
+        lo = np.searchsorted(self.lat, lat_min, side='left')
+        hi = np.searchsorted(self.lat, lat_max, side='right')
+        band_lon = self.lon[lo:hi]
+        hits = self.order[lo:hi][(band_lon >= lon_min) & (band_lon <= lon_max)]
+        hits.sort()
+        return hits
+
+
+def _count_within_bbox_numpy(lat, lon, lat_min, lat_max, lon_min, lon_max):
+    """Broadcast every box against every flight (N_boxes x N_flights)"""
+    hits = ((lat >= lat_min[:, None]) & (lat <= lat_max[:, None]) &
+            (lon >= lon_min[:, None]) & (lon <= lon_max[:, None]))
+    return np.count_nonzero(hits, axis=1)
+
+
+if njit is not None:
+    # fastmath without 'nnan': positions can be NaN and must stay unmatched
+    @njit(parallel=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'}, cache=True)
+    def _count_within_bbox_numba(lat, lon, lat_min, lat_max, lon_min, lon_max):
+        counts = np.zeros(lat_min.shape[0], dtype=np.int64)
+        for b in prange(lat_min.shape[0]):
+            n = 0
+            for i in range(lat.shape[0]):
+                if lat_min[b] <= lat[i] <= lat_max[b] and lon_min[b] <= lon[i] <= lon_max[b]:
+                    n += 1
+            counts[b] = n
+        return counts
+
+
+def count_within_bbox(lat: np.ndarray, lon: np.ndarray, lat_min, lat_max, lon_min, lon_max) -> np.ndarray:
+    """
+    Count flights inside each of several bounding boxes (edges inclusive)
+    
+    Args:
+        lat: Latitude per flight
+        lon: Longitude per flight
+        lat_min, lat_max, lon_min, lon_max: Box edges, scalars or one entry per box
+        
+    Returns:
+        Flight count per box
+    """
+    lat = np.ascontiguousarray(lat, dtype=np.float64)
+    lon = np.ascontiguousarray(lon, dtype=np.float64)
+    edges = np.broadcast_arrays(*(np.atleast_1d(np.asarray(e, dtype=np.float64))
+                                  for e in (lat_min, lat_max, lon_min, lon_max)))
+    edges = [np.ascontiguousarray(e) for e in edges]
+    
+    if njit is not None:
+        return _count_within_bbox_numba(lat, lon, *edges)
+    return _count_within_bbox_numpy(lat, lon, *edges)
+
+
+# Mean Earth radius (IUGG) for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _distance_bearing_numpy(lat, lon, lat0, lon0):
+    phi0, phi = np.radians(lat0), np.radians(lat)
+    dlam = np.radians(lon - lon0)
+    a = np.sin((phi - phi0) / 2) ** 2 + np.cos(phi0) * np.cos(phi) * np.sin(dlam / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    
+    y = np.sin(dlam) * np.cos(phi)
+    x = np.cos(phi0) * np.sin(phi) - np.sin(phi0) * np.cos(phi) * np.cos(dlam)
+    bearing = (np.degrees(np.arctan2(y, x)) + 360) % 360
+    return distance, bearing
+
+
+def _noise_db_numpy(altitude, distance_km):
+    # Basic noise model: 5dB less per 1000ft (max 40dB), 2dB less per km (max 20dB)
+    altitude_reduction = np.minimum(np.maximum(altitude, 100) / 1000 * 5, 40)
+    distance_reduction = np.minimum(np.maximum(distance_km, 0.1) * 2, 20)
+    noise = np.maximum(80 - altitude_reduction - distance_reduction, 30)
+    return np.where(np.isnan(altitude) | np.isinf(distance_km), 0.0, noise)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'}, cache=True)
+    def _distance_bearing_numba(lat, lon, lat0, lon0):
+        n = lat.shape[0]
+        distance = np.empty(n)
+        bearing = np.empty(n)
+        phi0 = np.radians(lat0)
+        sin_phi0, cos_phi0 = np.sin(phi0), np.cos(phi0)
+        for i in prange(n):
+            phi = np.radians(lat[i])
+            dlam = np.radians(lon[i] - lon0)
+            cos_phi = np.cos(phi)
+            a = np.sin((phi - phi0) / 2) ** 2 + cos_phi0 * cos_phi * np.sin(dlam / 2) ** 2
+            distance[i] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+            
+            y = np.sin(dlam) * cos_phi
+            x = cos_phi0 * np.sin(phi) - sin_phi0 * cos_phi * np.cos(dlam)
+            bearing[i] = (np.degrees(np.arctan2(y, x)) + 360) % 360
+        return distance, bearing
+    
+    @njit(parallel=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'}, cache=True)
+    def _noise_db_numba(altitude, distance_km):
+        n = altitude.shape[0]
+        noise = np.empty(n)
+        for i in prange(n):
+            if np.isnan(altitude[i]) or np.isinf(distance_km[i]):
+                noise[i] = 0.0
+                continue
+            altitude_reduction = min(max(altitude[i], 100.0) / 1000 * 5, 40.0)
+            distance_reduction = min(max(distance_km[i], 0.1) * 2, 20.0)
+            noise[i] = max(80 - altitude_reduction - distance_reduction, 30.0)
+        return noise
+
+
+def distance_bearing(lat: np.ndarray, lon: np.ndarray, lat0: float, lon0: float):
+    """
+    Great-circle (haversine) distance and initial bearing from a reference point
+    
+    Args:
+        lat: Latitude per flight
+        lon: Longitude per flight
+        lat0, lon0: Reference point (e.g. Schiphol or a residential area)
+        
+    Returns:
+        Tuple of (distance_km, bearing_deg) arrays; NaN where the position is unknown
+    """
+    lat = np.ascontiguousarray(lat, dtype=np.float64)
+    lon = np.ascontiguousarray(lon, dtype=np.float64)
+    if njit is not None:
+        return _distance_bearing_numba(lat, lon, float(lat0), float(lon0))
+    return _distance_bearing_numpy(lat, lon, float(lat0), float(lon0))
+
+
+def estimate_noise_db(altitude: np.ndarray, distance_km: np.ndarray) -> np.ndarray:
+    """
+    Estimate ground noise (dB) from altitude (ft) and distance (km)
+    
+    Simplified model - real noise depends on many factors. Unknown altitude
+    or distance gives 0.
+    """
+    altitude = np.ascontiguousarray(altitude, dtype=np.float64)
+    distance_km = np.ascontiguousarray(distance_km, dtype=np.float64)
+    if njit is not None:
+        return _noise_db_numba(altitude, distance_km)
+    return _noise_db_numpy(altitude, distance_km)
+
+
+def warm_up():
+    """Compile the numba kernels up front so the first real analysis doesn't pay for it"""
+    if njit is None:
+        return
+    one = np.zeros(1)
+    count_within_bbox(one, one, 0.0, 1.0, 0.0, 1.0)
+    distance_bearing(one, one, 0.0, 0.0)
+    estimate_noise_db(one, one)
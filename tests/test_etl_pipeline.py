@@ -0,0 +1,87 @@
+"""
+Tests for the threaded extract/transform pipeline and the COPY loader in etl_pipeline
+"""
+import csv
+import io
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from etl_pipeline import COPY_FLIGHTS_QUERY, COPY_NULL, FLIGHT_COLUMNS, AviationETLPipeline
+
+
+class SlowSourcePipeline(AviationETLPipeline):
+    """Pipeline whose extract stage yields small chunks with a delay, without SQLite"""
+
+    def iter_new_flights(self, last_processed_id=0, chunk_size=1):
+        for flight_id in range(last_processed_id + 1, last_processed_id + 11):
+            time.sleep(0.05)
+            yield [{'id': flight_id}]
+
+    def transform_flight_data(self, flights):
+        return flights
+
+
+def consume_in_thread(consume, timeout=10):
+    """Run consume() in a thread and return (finished, raised exception)"""
+    errors = []
+
+    def target():
+        try:
+            consume()
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    return not worker.is_alive(), errors[0] if errors else None
+
+
+def test_pipeline_yields_all_chunks_in_order():
+    pipeline = SlowSourcePipeline()
+    ids = [last_id for last_id, _, _ in pipeline._pipelined_chunks(0)]
+    assert ids == list(range(1, 11))
+
+
+def test_pipeline_returns_when_consumer_fails_mid_stream():
+    pipeline = SlowSourcePipeline()
+
+    def consume():
+        for _ in pipeline._pipelined_chunks(0):
+            raise RuntimeError("load failed")
+
+    finished, error = consume_in_thread(consume)
+    assert finished, "pipeline did not shut down after the consumer failed"
+    assert isinstance(error, RuntimeError)
+
+
+class RecordingCursor:
+    """Cursor stand-in that keeps what COPY would have received"""
+
+    def __init__(self):
+        self.copied = None
+
+    def execute(self, query, params=None):
+        pass
+
+    def copy_expert(self, query, buf):
+        self.copied = (query, buf.read())
+
+
+def test_copy_keeps_empty_strings_distinct_from_null():
+    pipeline = SlowSourcePipeline()
+    cursor = RecordingCursor()
+    flight = {'icao24': '484abc', 'callsign': '', 'origin_country': None}
+
+    assert pipeline._copy_flights(cursor, [flight]) == 1
+
+    query, data = cursor.copied
+    assert query == COPY_FLIGHTS_QUERY
+    row = dict(zip(FLIGHT_COLUMNS, next(csv.reader(io.StringIO(data)))))
+    assert row['icao24'] == '484abc'
+    assert row['callsign'] == ''
+    assert row['origin_country'] == COPY_NULL
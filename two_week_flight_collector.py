@@ -9,6 +9,7 @@ import schedule
 import sqlite3
 from pathlib import Path
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 import logging
 from typing import Dict, List
@@ -19,6 +20,10 @@ import sys
 # Import our modules
 from opensky_fetcher import OpenSkyFetcher
 from schiphol_analyzer import SchipholFlightAnalyzer
+from spatial_kernels import distance_bearing
+
+# Rows per fetchmany() batch when scanning a day of flights for insights
+INSIGHTS_CHUNK_SIZE = 10000
 
 
 class TwoWeekFlightCollector:
@@ -90,6 +95,10 @@ class TwoWeekFlightCollector:
         """Setup optimized database for 2-week pattern analysis"""
         conn = sqlite3.connect(self.db_path)
         
+        # WAL lets the ETL pipeline read while collection keeps writing
+        # (persistent for the database file)
+        conn.execute('PRAGMA journal_mode=WAL')
+        
         # Enhanced flights table with pattern analysis fields
         conn.execute('''
             CREATE TABLE IF NOT EXISTS flights (
@@ -195,14 +204,15 @@ class TwoWeekFlightCollector:
             creds = self.load_credentials()
             self.fetcher = OpenSkyFetcher(**creds)
         
-        # Set appropriate bounds
+        # Appropriate bounds (passed per call, the fetcher's default bounds
+        # are left untouched)
         if area_type == 'local':
-            self.fetcher.AMSTERDAM_NOORD_BOUNDS = self.collection_settings['local_bounds']
+            bounds = self.collection_settings['local_bounds']
         else:  # schiphol
-            self.fetcher.AMSTERDAM_NOORD_BOUNDS = self.collection_settings['schiphol_bounds']
+            bounds = self.collection_settings['schiphol_bounds']
         
         try:
-            flights = self.fetcher.get_current_flights()
+            flights = self.fetcher.get_current_flights(bounds=bounds)
             self.stats['api_calls_made'] += 1
             
             if not flights.empty:
@@ -263,14 +273,12 @@ class TwoWeekFlightCollector:
         
         house_coords = self.collection_settings['house_coords']
         
-        # Distance calculations
-        def calc_distance(row):
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                return float('inf')
-            from geopy.distance import geodesic
-            return geodesic((row['latitude'], row['longitude']), house_coords).kilometers
-        
-        flights['distance_to_house_km'] = flights.apply(calc_distance, axis=1)
+        # Distance calculations in one vectorized haversine pass
+        # (unknown position -> inf)
+        distance_km, _ = distance_bearing(
+            flights['latitude'].to_numpy(), flights['longitude'].to_numpy(), *house_coords
+        )
+        flights['distance_to_house_km'] = np.where(np.isnan(distance_km), np.inf, distance_km)
         
         # Pattern detection flags
         flights['is_over_house'] = flights['distance_to_house_km'] <= 1.0  # Within 1km of house
@@ -285,13 +293,9 @@ class TwoWeekFlightCollector:
         
         # Aircraft classification
         if 'icao24' in flights.columns:
-            classifications = flights.apply(
-                lambda row: self.analyzer.classify_aircraft_by_icao(
-                    row.get('icao24', ''), 
-                    row.get('callsign', '')
-                ), axis=1
-            )
-            flights['aircraft_category'] = [c.get('category', 'Unknown') for c in classifications]
+            flights['aircraft_category'] = self.analyzer.classify_aircraft_by_icao_vec(
+                flights['icao24'], flights.get('callsign')
+            )['category']
         
         return flights
     
@@ -335,18 +339,44 @@ class TwoWeekFlightCollector:
         
         today = datetime.now().date()
         
-        # Get today's flight patterns
-        today_data = pd.read_sql_query('''
-            SELECT * FROM flights 
+        # Stream today's flights in batches and keep running totals, so memory
+        # stays bounded by the batch size instead of a full day of rows
+        cursor = conn.execute('''
+            SELECT is_over_house, hour_of_day, is_high_noise, estimated_noise_db
+            FROM flights 
             WHERE DATE(collection_time) = ?
-        ''', conn, params=(today,))
-        
-        if not today_data.empty:
+        ''', (today,))
+        
+        total_flights = 0
+        house_flights = 0
+        house_flights_by_hour = np.zeros(24, dtype=np.int64)
+        high_noise_flights = 0
+        high_noise_db_sum = 0.0
+        high_noise_db_count = 0
+        
+        while True:
+            rows = cursor.fetchmany(INSIGHTS_CHUNK_SIZE)
+            if not rows:
+                break
+            batch = np.array(rows, dtype=np.float64)  # NULL -> NaN
+            total_flights += len(rows)
+            
+            over_house = batch[:, 0] == 1
+            house_flights += int(np.count_nonzero(over_house))
+            hours = batch[over_house, 1]
+            house_flights_by_hour += np.bincount(hours[~np.isnan(hours)].astype(np.int64), minlength=24)[:24]
+            
+            high_noise = batch[:, 2] == 1
+            high_noise_flights += int(np.count_nonzero(high_noise))
+            noise_db = batch[high_noise, 3]
+            noise_db = noise_db[~np.isnan(noise_db)]
+            high_noise_db_sum += float(noise_db.sum())
+            high_noise_db_count += noise_db.size
+        
+        if total_flights:
             insights = []
             
             # Flight frequency analysis
-            total_flights = len(today_data)
-            house_flights = len(today_data[today_data['is_over_house'] == 1])
             
             if house_flights > 0:
                 insights.append({
@@ -357,24 +387,23 @@ class TwoWeekFlightCollector:
                 })
             
             # Peak hours analysis
-            hourly_house_flights = today_data[today_data['is_over_house'] == 1]['hour_of_day'].value_counts()
-            if not hourly_house_flights.empty:
-                peak_hour = hourly_house_flights.index[0]
+            if house_flights_by_hour.any():
+                peak_hour = int(house_flights_by_hour.argmax())
+                peak_count = int(house_flights_by_hour[peak_hour])
                 insights.append({
                     'type': 'peak_activity',
-                    'description': f"Peak flight activity over your house: {peak_hour}:00-{peak_hour+1}:00 ({hourly_house_flights.iloc[0]} flights)",
-                    'data_points': hourly_house_flights.iloc[0],
+                    'description': f"Peak flight activity over your house: {peak_hour}:00-{peak_hour+1}:00 ({peak_count} flights)",
+                    'data_points': peak_count,
                     'confidence': 'medium'
                 })
             
             # Noise impact analysis
-            high_noise = today_data[today_data['is_high_noise'] == 1]
-            if not high_noise.empty:
-                avg_noise = high_noise['estimated_noise_db'].mean()
+            if high_noise_flights:
+                avg_noise = high_noise_db_sum / high_noise_db_count if high_noise_db_count else float('nan')
                 insights.append({
                     'type': 'noise_analysis',
-                    'description': f"{len(high_noise)} high-noise events today (avg: {avg_noise:.1f} dB)",
-                    'data_points': len(high_noise),
+                    'description': f"{high_noise_flights} high-noise events today (avg: {avg_noise:.1f} dB)",
+                    'data_points': high_noise_flights,
                     'confidence': 'high'
                 })
             